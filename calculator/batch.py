@@ -0,0 +1,206 @@
+"""Stream expressions through the engine without a GUI.
+
+Input is read one line at a time and every result is written as soon as it
+is computed, so memory use does not grow with the size of the input. With
+more than one worker, chunks of lines are evaluated in a process pool and
+written back in input order; only a few chunks are in flight at a time.
+With a deadline, each expression runs in a killable EvaluationPool worker.
+With digits set, expressions are evaluated in Decimal arithmetic to that
+many significant digits (see precision.py), and with exact set in exact
+rational arithmetic (see rational.py).
+"""
+import csv
+import decimal
+import json
+import math
+import multiprocessing
+import os
+from collections import deque
+from fractions import Fraction
+from itertools import islice
+
+from formatting import STR_BITS, format_number, int_to_str
+from pool import EvaluationPool, make_engine
+
+FORMATS = ('text', 'csv', 'jsonl')
+
+
+def evaluate_line(engine, expression, trig_mode):
+    """Return (result, error) for one expression; exactly one of them is None"""
+    try:
+        return engine.evaluate(expression, trig_mode), None
+    except ValueError as e:
+        return None, str(e)
+    except Exception as e:
+        return None, f"Evaluation error: {e}"
+
+
+def read_expressions(lines):
+    """Yield (line number, expression) for each non-blank input line"""
+    for number, line in enumerate(lines, 1):
+        expression = line.strip()
+        if expression:
+            yield number, expression
+
+
+def json_value(result):
+    """Return a result in a form json.dumps writes as valid JSON"""
+    # JSON has no nan or inf, so those go out as strings, and json.dumps
+    # can't write ints past Python's str() limit, so every digit goes out as
+    # a string for those too; Decimals and Fractions keep their digits as strings
+    if isinstance(result, float) and not math.isfinite(result):
+        return str(result)
+    if type(result) is int and result.bit_length() >= STR_BITS:
+        return int_to_str(result)
+    if type(result) is decimal.Decimal:
+        return str(result)
+    if type(result) is Fraction:
+        return format_number(result, full=True)
+    return result
+
+
+class TextWriter:
+    """Writes 'expression = result' lines"""
+
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, number, expression, result, error):
+        if error is None:
+            self.out.write(f"{expression} = {format_number(result, full=True)}\n")
+        else:
+            self.out.write(f"{expression} = Error: {error}\n")
+
+
+class CsvWriter:
+    """Writes line, expression, result, error rows after a header"""
+
+    def __init__(self, out):
+        self.writer = csv.writer(out, lineterminator='\n')
+        self.writer.writerow(['line', 'expression', 'result', 'error'])
+
+    def write(self, number, expression, result, error):
+        self.writer.writerow([number, expression, '' if result is None else format_number(result, full=True),
+                              error or ''])
+
+
+class JsonlWriter:
+    """Writes one JSON object per expression"""
+
+    def __init__(self, out):
+        self.out = out
+
+    def write(self, number, expression, result, error):
+        record = {'line': number, 'expression': expression}
+        if error is None:
+            record['result'] = json_value(result)
+        else:
+            record['error'] = error
+        self.out.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+
+WRITERS = {'text': TextWriter, 'csv': CsvWriter, 'jsonl': JsonlWriter}
+
+
+# Engine owned by a pool worker process
+_worker_engine = None
+
+
+def _evaluate_chunk(expressions, trig_mode, digits, exact):
+    global _worker_engine
+    if _worker_engine is None:
+        _worker_engine = make_engine(digits, exact)
+    return [evaluate_line(_worker_engine, expression, trig_mode) for expression in expressions]
+
+
+def _chunks(records, size):
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _evaluate_serial(records, trig_mode, engine, digits, exact):
+    engine = engine or make_engine(digits, exact)
+    for number, expression in records:
+        yield number, expression, evaluate_line(engine, expression, trig_mode)
+
+
+def _evaluate_parallel(records, trig_mode, workers, chunk_size, digits, exact):
+    with multiprocessing.Pool(workers) as pool:
+        # Two chunks per worker keeps every process busy while bounding memory
+        pending = deque()
+        for chunk in _chunks(records, chunk_size):
+            expressions = [expression for _, expression in chunk]
+            pending.append((chunk, pool.apply_async(_evaluate_chunk, (expressions, trig_mode, digits, exact))))
+            if len(pending) >= workers * 2:
+                yield from _finish_chunk(*pending.popleft())
+        while pending:
+            yield from _finish_chunk(*pending.popleft())
+
+
+def _evaluate_in_pool(records, trig_mode, workers, deadline, digits, exact):
+    with EvaluationPool(workers, deadline) as pool:
+        pending = deque()
+        for number, expression in records:
+            pending.append((number, expression, pool.submit(expression, trig_mode, digits=digits, exact=exact)))
+            if len(pending) >= workers * 64:
+                yield _pool_outcome(*pending.popleft())
+        while pending:
+            yield _pool_outcome(*pending.popleft())
+
+
+def _pool_outcome(number, expression, future):
+    try:
+        return number, expression, (future.result(), None)
+    except ValueError as e:
+        return number, expression, (None, str(e))
+
+
+def _finish_chunk(chunk, job):
+    for (number, expression), outcome in zip(chunk, job.get()):
+        yield number, expression, outcome
+
+
+def run_batch(lines, out, fmt='text', trig_mode='rad', flush_every=1000, engine=None,
+              workers=1, chunk_size=1000, deadline=None, digits=None, exact=False):
+    """Evaluate every expression in lines and write the results to out
+
+    workers > 1 evaluates chunks of chunk_size lines in that many processes
+    (0 means one per CPU); results are still written in input order. With a
+    deadline in seconds, every expression instead runs in an EvaluationPool
+    worker that is killed if it takes longer. digits switches to Decimal
+    arithmetic with that many significant digits and exact to exact
+    rational arithmetic, in place of an engine passed in. Output is flushed after every
+    flush_every records. Returns a (evaluated, failed) pair of counts.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown format '{fmt}'. Choose from: {', '.join(FORMATS)}")
+    if flush_every < 1:
+        raise ValueError(f"flush_every must be at least 1, not {flush_every}")
+    writer = WRITERS[fmt](out)
+
+    records = read_expressions(lines)
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if deadline:
+        results = _evaluate_in_pool(records, trig_mode, workers, deadline, digits, exact)
+    elif workers > 1:
+        results = _evaluate_parallel(records, trig_mode, workers, chunk_size, digits, exact)
+    else:
+        custom = digits is None and not exact
+        results = _evaluate_serial(records, trig_mode, engine if custom else None, digits, exact)
+
+    evaluated = failed = 0
+    for number, expression, (result, error) in results:
+        writer.write(number, expression, result, error)
+        evaluated += 1
+        if error is not None:
+            failed += 1
+        if evaluated % flush_every == 0:
+            out.flush()
+
+    out.flush()
+    return evaluated, failed
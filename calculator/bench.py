@@ -0,0 +1,576 @@
+"""Micro-benchmarks for the expression engine.
+
+Run ``python bench.py`` for every benchmark, or name the ones you want,
+e.g. ``python bench.py ast``. Nothing here needs a display.
+"""
+import math
+import re
+import sys
+import timeit
+
+from engine import Engine
+
+# Registered benchmarks, in the order they were added
+BENCHMARKS = {}
+
+SAMPLE_EXPRESSIONS = [
+    '1+2*3',
+    '(1+2)*(3+4)/5',
+    '2**10-1',
+    'math.sin(0.5)+math.cos(0.5)',
+    'sqrt(16)+log10(100)*exp(1)',
+    '3.5*pi-e',
+    'sin(30)+cos(60)+tan(45)',
+]
+
+
+def benchmark(name):
+    """Register a benchmark function under a command-line name"""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def report(label, seconds, number):
+    """Print the time per call in microseconds"""
+    print(f"  {label:<44} {seconds / number * 1e6:12.2f} us/call")
+
+
+def best_of(func, number, repeat=5):
+    """Return the best total time of several timing runs"""
+    return min(timeit.repeat(func, number=number, repeat=repeat))
+
+
+def legacy_safe_eval(expression, trig_mode="rad"):
+    """The regex rewrite + compile + eval pipeline the engine started from, kept for comparison"""
+    allowed_names = {
+        'math': math, 'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
+        'log': math.log, 'log10': math.log10, 'sqrt': math.sqrt, 'exp': math.exp,
+        'abs': abs, 'pi': math.pi, 'e': math.e, 'radians': math.radians, 're': re
+    }
+    expression = expression.replace('^', '**')
+    expression = expression.replace('()', '(0)')
+    if '__' in expression or ';' in expression:
+        raise ValueError("Invalid expression")
+    if trig_mode == "deg":
+        pattern = r'(math\.)?(sin|cos|tan)\((.*?)\)'
+
+        def degree_converter(match):
+            math_prefix = match.group(1) or ''
+            func = match.group(2)
+            arg = match.group(3)
+            if 'math.radians(' in arg:
+                return f"{math_prefix}{func}({arg})"
+            return f"{math_prefix}{func}(math.radians({arg}))"
+
+        while True:
+            new_expression = re.sub(pattern, degree_converter, expression)
+            if new_expression == expression:
+                break
+            expression = new_expression
+    for func in ['sin', 'cos', 'tan', 'log', 'log10', 'sqrt', 'exp', 'abs']:
+        expression = re.sub(r'(?<![a-zA-Z.])' + func + r'(?=\()', f'math.{func}', expression)
+    code = compile(expression, '<string>', 'eval')
+    for name in code.co_names:
+        if name not in allowed_names:
+            raise ValueError(f"Use of '{name}' not allowed")
+    return eval(code, {'__builtins__': {}}, allowed_names)
+
+
+def legacy_prepare(expr):
+    """The character-by-character preprocessing the '=' button started from"""
+    expr += ')' * max(0, expr.count('(') - expr.count(')'))
+    if expr.count('(') != expr.count(')'):
+        raise ValueError("Invalid expression format")
+    checked = expr.replace('**', '@')
+    for i in range(len(checked)-1):
+        if checked[i] in '+-*/%' and checked[i+1] in '+-*/%':
+            raise ValueError("Invalid expression format")
+    expr = expr.replace('×', '*').replace('÷', '/')
+    new_expr = []
+    for i in range(len(expr)):
+        new_expr.append(expr[i])
+        if i < len(expr)-1:
+            current = expr[i]
+            next_char = expr[i+1]
+            if (current.isdigit() and (next_char == '(' or next_char.isalpha())) or \
+            (current == ')' and (next_char.isdigit() or next_char == '(' or next_char.isalpha())) or \
+            (current == 'π' and (next_char.isdigit() or next_char == '(' or next_char.isalpha())):
+                new_expr.append('*')
+    expr = ''.join(new_expr).replace('^', '**').replace('()', '(0)')
+    for func in ['sin', 'cos', 'tan', 'log', 'log10', 'sqrt', 'exp', 'abs']:
+        expr = re.sub(r'(?<![a-zA-Z.])' + func + r'(?=\()', f'math.{func}', expr)
+    return expr
+
+
+@benchmark('ast')
+def bench_ast():
+    """AST evaluator against the legacy regex pipeline"""
+    uncached = Engine(cache_size=0)
+    cached = Engine()
+    number = 2000
+    for mode in ('rad', 'deg'):
+        print(f"{len(SAMPLE_EXPRESSIONS)} expressions, {mode} mode")
+
+        def run_legacy():
+            for expr in SAMPLE_EXPRESSIONS:
+                legacy_safe_eval(expr, mode)
+
+        def run_uncached():
+            for expr in SAMPLE_EXPRESSIONS:
+                uncached.safe_eval(expr, mode)
+
+        def run_cached():
+            for expr in SAMPLE_EXPRESSIONS:
+                cached.safe_eval(expr, mode)
+
+        report("legacy regex + compile + eval", best_of(run_legacy, number), number)
+        report("ast parse + compile + eval (no cache)", best_of(run_uncached, number), number)
+        report("ast, cached code", best_of(run_cached, number), number)
+
+
+@benchmark('tokenize')
+def bench_tokenize():
+    """Single-pass tokenizer against the legacy character scans"""
+    from tokenizer import to_source, tokenize
+
+    for terms in (10, 100, 1000):
+        expr = '+'.join(['2(3.5×4)÷7', 'sqrt(16)^2', '12345.678'] * terms)
+        number = max(1, 2000 // terms)
+        print(f"{len(expr)} characters")
+        report("legacy validate + implicit * + rewrites", best_of(lambda: legacy_prepare(expr), number), number)
+        report("tokenize + validate + implicit *", best_of(lambda: to_source(tokenize(expr)), number), number)
+
+
+@benchmark('degrees')
+def bench_degrees():
+    """Deeply nested trig in degree and radian mode"""
+    uncached = Engine(cache_size=0)
+    for depth in (1, 5, 20, 50):
+        expr = 'sin(' * depth + '30' + ')' * depth
+        number = max(1, 1000 // depth)
+        legacy = legacy_safe_eval(expr, 'deg')
+        result = uncached.safe_eval(expr, 'deg')
+        print(f"nesting depth {depth} (legacy result {legacy:.10g}, engine result {result:.10g})")
+        report("legacy regex, deg", best_of(lambda: legacy_safe_eval(expr, 'deg'), number), number)
+        report("engine, rad (no cache)", best_of(lambda: uncached.safe_eval(expr, 'rad'), number), number)
+        report("engine, deg (no cache)", best_of(lambda: uncached.safe_eval(expr, 'deg'), number), number)
+
+
+@benchmark('array')
+def bench_array():
+    """One expression over many x values"""
+    import engine
+
+    expr = '3x^2+sqrt(abs(x))*sin(x)-log10(x+2)'
+    size = 100000
+    values = [i / size for i in range(size)]
+    eng = Engine()
+    print(f"{expr} over {size} points")
+
+    def per_value():
+        for value in values:
+            eng.safe_eval(expr.replace('x', f'({value!r})'))
+
+    report("one safe_eval per value (per point)", best_of(per_value, 1, repeat=1), size)
+
+    numpy = engine.load_numpy()
+    engine._numpy = None
+    try:
+        report("evaluate_array, Python loop (per point)",
+               best_of(lambda: eng.evaluate_array(expr, values), 1, repeat=3), size)
+    finally:
+        engine._numpy = numpy
+
+    if numpy is None:
+        print("  NumPy not installed, skipping vectorised run")
+        return
+    array = numpy.asarray(values)
+    report("evaluate_array, NumPy (per point)",
+           best_of(lambda: eng.evaluate_array(expr, array), 1, repeat=3), size)
+
+
+@benchmark('callable')
+def bench_callable():
+    """compile_expr callables against string evaluation"""
+    from engine import compile_expr
+
+    eng = Engine()
+    func = compile_expr('sin(x)*y+sqrt(x)', vars=('x', 'y'))
+    number = 20000
+    values = iter(range(10 ** 9))
+
+    def formatted():
+        x = next(values) / 7
+        eng.safe_eval(f'sin({x})*2.5+sqrt({x})')
+
+    report("safe_eval with values formatted in (cache miss)", best_of(formatted, 1000), 1000)
+    report("safe_eval of the same string (cache hit)",
+           best_of(lambda: eng.safe_eval('sin(1.5)*2.5+sqrt(1.5)'), number), number)
+    report("compiled callable", best_of(lambda: func(1.5, 2.5), number), number)
+
+
+@benchmark('parallel')
+def bench_parallel():
+    """Batch throughput against worker count"""
+    import io
+    import os
+    import time
+    from batch import run_batch
+
+    lines = [f"{i}*sqrt({i % 97})+sin({i})^2-{i}%7\n" for i in range(200000)]
+    cpus = os.cpu_count() or 1
+    counts = sorted({1, 2, 4, cpus})
+    print(f"{len(lines)} expressions, {cpus} CPU(s), chunk size 2000")
+    for workers in counts:
+        start = time.perf_counter()
+        run_batch(lines, io.StringIO(), 'text', 'deg', workers=workers, chunk_size=2000)
+        elapsed = time.perf_counter() - start
+        print(f"  {workers:>3} worker(s) {len(lines) / elapsed:14.0f} expressions/s")
+
+
+@benchmark('powmod')
+def bench_powmod():
+    """a ** b % m through three-argument pow against building a ** b"""
+    uncached = Engine(cache_size=0)
+    cached = Engine()
+    number = 2000
+    for power in (3, 4, 5, 6, 9):
+        exponent = 10 ** power
+        expr = f'7**10**{power} % 1000'
+        print(expr)
+        if power <= 6:
+            naive = compile(f'7**{exponent} % 1000', '<naive>', 'eval')
+            naive_number = max(1, 10 ** 7 // exponent ** 2)
+            report("Python ** then % (precompiled)", best_of(lambda: eval(naive), naive_number, repeat=3), naive_number)
+        else:
+            print(f"  {'Python ** then % (precompiled)':<44} skipped, would build a "
+                  f"{exponent * math.log10(7):,.0f} digit integer")
+        report("engine, powmod rewrite (no cache)", best_of(lambda: uncached.safe_eval(expr), number), number)
+        report("engine, powmod rewrite (cached code)", best_of(lambda: cached.safe_eval(expr), number), number)
+
+
+@benchmark('factorial')
+def bench_factorial():
+    """Memo table and prime-swing factorials against math.factorial"""
+    from factorial import factorial
+
+    for n in (10, 100, 1000, 10 ** 4, 10 ** 5, 10 ** 6):
+        number = max(1, 10 ** 6 // n ** 2)
+        repeat = 5 if n <= 10 ** 4 else 1
+        print(f"n = {n:,}")
+        report("math.factorial", best_of(lambda: math.factorial(n), number, repeat), number)
+        report("factorial.factorial", best_of(lambda: factorial(n), number, repeat), number)
+
+
+@benchmark('format')
+def bench_format():
+    """Big-integer display text against str()"""
+    from formatting import format_number, int_to_str
+
+    limit = getattr(sys, 'get_int_max_str_digits', None)
+    if limit:
+        saved = limit()
+        sys.set_int_max_str_digits(0)  # let str() run past its default 4300 digits
+    try:
+        for power in (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6):
+            value = 7 ** power
+            number = max(1, 10 ** 8 // power ** 2)
+            repeat = 3 if power < 10 ** 6 else 1
+            print(f"7**{power:,} ({len(str(value)):,} digits)")
+            report("str()", best_of(lambda: str(value), number, repeat), number)
+            report("int_to_str (every digit)", best_of(lambda: int_to_str(value), number, repeat), number)
+            report("format_number (scientific)", best_of(lambda: format_number(value), 100, 3), 100)
+    finally:
+        if limit:
+            sys.set_int_max_str_digits(saved)
+
+
+@benchmark('precision')
+def bench_precision():
+    """Decimal mode speed and accuracy against float mode"""
+    import decimal
+    from engine import Engine
+    from precision import DecimalEngine
+
+    expressions = ['sin(1.1)', 'cos(1.1)', 'tan(1.1)', 'log(7)', 'log10(7)', 'exp(2.5)', 'sqrt(7)', '7**(1/5)']
+    engine = Engine()
+
+    def correct_digits(value, reference, precision):
+        # Matching significant digits, judged against a result 20 digits more precise
+        with decimal.localcontext(decimal.Context(prec=precision)):
+            error = abs(decimal.Decimal(value) - reference) / abs(reference)
+            return precision if error == 0 else max(0, -error.log10())
+
+    for digits in (None, 50, 500, 5000):
+        reference_engine = DecimalEngine((digits or 17) + 20)
+        if digits is None:
+            print("float")
+            current = engine
+        else:
+            print(f"{digits} digits")
+            current = DecimalEngine(digits)
+        number = 10000 if digits is None else max(1, 10000 // digits ** 2 * 10)
+        repeat = 1 if digits == 5000 else 3
+        for expression in expressions:
+            seconds = best_of(lambda: current.safe_eval(expression), number, repeat)
+            accuracy = correct_digits(current.safe_eval(expression), reference_engine.safe_eval(expression),
+                                      reference_engine.precision)
+            report(f"{expression:10} {accuracy:6.1f} digits correct", seconds, number)
+
+
+def legacy_machin_pi(places):
+    """pi * 10**places by Machin's formula, as decimal mode first computed it"""
+    def arctan_inverse(n, unity):
+        term = total = unity // n
+        k, sign = 1, -1
+        while term:
+            term //= n * n
+            k += 2
+            total += sign * (term // k)
+            sign = -sign
+        return total
+
+    unity = 10 ** places
+    return 4 * (4 * arctan_inverse(5, unity) - arctan_inverse(239, unity))
+
+
+@benchmark('constants')
+def bench_constants():
+    """Chudnovsky pi against Machin, and reading constants back from disk"""
+    import tempfile
+    import constants
+
+    for places in (1000, 10000, 100000):
+        number = max(1, 10 ** 7 // places ** 2)
+        repeat = 3 if places < 100000 else 1
+        print(f"pi to {places:,} places")
+        report("Machin", best_of(lambda: legacy_machin_pi(places), number, repeat), number)
+        report("Chudnovsky, binary splitting", best_of(lambda: constants._pi(places), number, repeat), number)
+
+    saved = constants.CACHE_DIR
+    with tempfile.TemporaryDirectory() as directory:
+        constants.CACHE_DIR = directory
+        try:
+            for name in ('pi', 'e', 'ln2', 'ln10'):
+                constants.fixed_point(name, 10000)
+
+            def from_disk():
+                constants._fixed.clear()
+                for name in ('pi', 'e', 'ln2', 'ln10'):
+                    constants.fixed_point(name, 10000)
+            print("pi, e, ln 2 and ln 10 to 10,000 places")
+            report("read from the disk cache", best_of(from_disk, 100), 100)
+        finally:
+            constants.CACHE_DIR = saved
+            constants._fixed.clear()
+
+
+@benchmark('rational')
+def bench_rational():
+    """Exact mode on long chains of exact operations, against float mode"""
+    from fractions import Fraction
+    from engine import Engine
+    from rational import RationalEngine
+
+    # Uncached, so each run parses and compiles like a freshly typed expression;
+    # cached float code would have every literal-only chain folded to a constant
+    float_engine = Engine(cache_size=0)
+    exact_engine = RationalEngine(cache_size=0)
+    chains = {
+        'integers, 200 operations': '+'.join(f'{i}*{i + 1}-{i}' for i in range(1, 101)),
+        'harmonic sum to 1/100': '+'.join(f'1/{i}' for i in range(1, 101)),
+        'decimal literals, 100 terms': '+'.join(f'0.{i:02d}*3' for i in range(1, 101)),
+    }
+    for label, expression in chains.items():
+        print(label)
+        report("float mode (rounded)", best_of(lambda: float_engine.safe_eval(expression), 200, 3), 200)
+        report("exact mode", best_of(lambda: exact_engine.safe_eval(expression), 200, 3), 200)
+
+    # The same compiled chain fed ints, which stay on the int fast path, and
+    # then whole Fractions, which is what every value would be without it
+    names = [f'x{i}' for i in range(50)]
+    function = exact_engine.compile_function('+'.join(f'{name}*{name}-{name}' for name in names), names)
+    ints = list(range(1, 51))
+    fractions = [Fraction(i) for i in ints]
+    print("150 operations on whole numbers")
+    report("int fast path", best_of(lambda: function(*ints), 10000, 3), 10000)
+    report("Fraction throughout", best_of(lambda: function(*fractions), 10000, 3), 10000)
+
+
+@benchmark('integer')
+def bench_integer():
+    """Integer expressions through the integer path against the general path"""
+    from engine import Engine, format_result
+
+    class GeneralEngine(Engine):
+        def _fold(self, code):
+            return None  # no integer path: the value is always worked out at evaluation
+
+    general_engine = GeneralEngine(cache_size=0)
+    uncached = Engine(cache_size=0)
+    cached = Engine()
+    names = general_engine.allowed_names
+    builtins = {'__builtins__': {}}
+
+    def general(expression):
+        # What evaluate() did for every expression: run the code, then check for floats
+        return format_result(eval(general_engine.compile(expression), builtins, names), 10)
+
+    for expression in ('12345*6789+42', '2**200-3**100', '7**1000 % 1000', 'factorial(30) % 3**20',
+                       '(123456789*987654321)**3 % 1000000007'):
+        print(expression)
+        report("general path (no cache)", best_of(lambda: general(expression), 10000, 3), 10000)
+        report("integer path (no cache)", best_of(lambda: uncached.evaluate(expression), 10000, 3), 10000)
+        report("integer path (cached value)", best_of(lambda: cached.evaluate(expression), 100000, 3), 100000)
+
+
+def legacy_point_allowed(current):
+    """The decimal-point check that rescanned the whole display on every key"""
+    tokens = []
+    current_token = ""
+    for c in current:
+        if c in '+-*/%()^':
+            if current_token:
+                tokens.append(current_token)
+                current_token = ""
+            tokens.append(c)
+        else:
+            current_token += c
+    if current_token:
+        tokens.append(current_token)
+    return bool(tokens) and '.' not in tokens[-1]
+
+
+@benchmark('input')
+def bench_input():
+    """Per-key input checks: rescanning the display against the incremental model"""
+    from input_state import InputState
+
+    for length in (20, 200, 2000):
+        text = ('12.5+(3*4)-' * length)[:length]
+        state = InputState(text)
+        print(f"display of {length:,} characters")
+        report("'.' and ')' checks by rescanning",
+               best_of(lambda: (legacy_point_allowed(text), text.count('(') > text.count(')')), 10000, 3), 10000)
+
+        def incremental():
+            # One key typed and taken back, with the same two checks
+            state.append('7')
+            state.point_allowed()
+            state.depth > 0
+            state.pop()
+        report("incremental model", best_of(incremental, 10000, 3), 10000)
+
+
+@benchmark('state')
+def bench_state():
+    """Key handling in the calculator's state model, without Tk"""
+    from state import CalculatorState
+
+    state = CalculatorState()
+    keys = list('12.5*(3+4)-7/8')
+
+    def typing():
+        # One expression typed key by key, then cleared
+        for key in keys:
+            if key.isdigit() or key == '.':
+                state.type_digit(key)
+            else:
+                state.type_operator(key)
+        state.clear()
+    report(f"{len(keys)} keys and a clear", best_of(typing, 10000, 3), 10000)
+
+    state.type_digit('9')
+    report("backspace and retype", best_of(lambda: (state.backspace(), state.type_digit('9')), 10000, 3), 10000)
+
+
+def legacy_dispatch(calculator, button_text):
+    """The calculator's button dispatch before the table: a dict rebuilt per click, then an if/elif chain"""
+    state = calculator.state
+    function_map = {
+        'sin': 'math.sin(',
+        'cos': 'math.cos(',
+        'tan': 'math.tan(',
+        'log': 'math.log10(',
+        'ln': 'math.log(',
+        '√': 'math.sqrt(',
+        'eˣ': 'math.exp(',
+        '|x|': 'abs('
+    }
+    if button_text in function_map:
+        if button_text in ['log', 'ln']:
+            calculator.handle_logarithm('10' if button_text == 'log' else 'natural')
+        else:
+            state.append(function_map[button_text])
+        return
+    if button_text.isdigit() or button_text == '.':
+        state.type_digit(button_text)
+    elif button_text in ['+', '-', '*', '/', '(', ')']:
+        state.type_operator(button_text)
+    elif button_text == '=':
+        calculator.calculate_result()
+    elif button_text == 'C':
+        state.clear()
+    elif button_text == '⌫':
+        state.backspace()
+    elif button_text == '+/-':
+        state.toggle_sign()
+    elif button_text == 'xʸ':
+        state.type_power()
+    elif button_text == 'n!':
+        calculator.handle_factorial()
+    elif button_text == 'π':
+        state.append('math.pi')
+    elif button_text == 'Mod':
+        state.append('%')
+    elif button_text == '10ˣ':
+        state.append('10**')
+    elif button_text == 'x²':
+        state.append('**2')
+    elif button_text == '1/x':
+        calculator.handle_reciprocal()
+    elif button_text == 'D/R':
+        calculator.toggle_trig_mode()
+    elif button_text in ['MC', 'MR', 'M+', 'M-', 'MS']:
+        calculator.handle_memory_operations(button_text)
+    elif button_text == 'ⁿ√':
+        state.type_nth_root()
+
+
+@benchmark('dispatch')
+def bench_dispatch():
+    """Finding and running a button's handler: if/elif chain against the table"""
+    from calculator import Calculator
+    from state import CalculatorState
+
+    # Only the state and the handler table are needed, with nothing being evaluated; no window is made
+    calculator = Calculator.__new__(Calculator)
+    calculator.state = CalculatorState()
+    calculator.busy_future = None
+    handlers = calculator.make_button_handlers()
+
+    # Early in the chain, late in the chain, and the function buttons it checks first
+    for keys in (['7', '⌫'], ['π', '⌫'] * 7, ['ⁿ√', 'C'], ['sin', 'C']):
+        label = ' '.join(dict.fromkeys(keys))
+        report(f"{label}: if/elif chain", best_of(lambda: [legacy_dispatch(calculator, key) for key in keys],
+                                                  10000, 3), 10000 * len(keys))
+        report(f"{label}: table", best_of(lambda: [handlers[key]() for key in keys], 10000, 3),
+               10000 * len(keys))
+
+
+def main(argv):
+    names = argv or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark '{name}'. Choose from: {', '.join(BENCHMARKS)}")
+            return 1
+    for name in names:
+        print(f"== {name}: {BENCHMARKS[name].__doc__}")
+        BENCHMARKS[name]()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
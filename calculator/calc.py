@@ -1,3 +1,10 @@
+import argparse
+import sys
+
+from batch import FORMATS, run_batch
+from engine import evaluate
+from formatting import format_number
+
 def get_valid_number(prompt):
     while True:
         user_input = input(prompt)
@@ -7,21 +14,24 @@ def get_valid_number(prompt):
             print(f"'{user_input}' is not a valid number. Please try again.")
 
 def calculate(operation):
-    operations = {
-        "add": lambda a, b: a + b,
-        "subtract": lambda a, b: a - b,
-        "multiply": lambda a, b: a * b,
-        "divide": lambda a, b: a / b if b != 0 else "Error: Division by zero!"
+    operators = {
+        "add": "+",
+        "subtract": "-",
+        "multiply": "*",
+        "divide": "/"
     }
     
     print(f"Enter two numbers to {operation}.")
     num1 = get_valid_number("First number: ")
     num2 = get_valid_number("Second number: ")
     
-    result = operations[operation](num1, num2)
-    print(f"The result is: {result}")
+    if operation == "divide" and num2 == 0:
+        result = "Error: Division by zero!"
+    else:
+        result = evaluate(f"({num1}){operators[operation]}({num2})")
+    print(f"The result is: {format_number(result)}")
 
-def main():
+def interactive():
     while True:
         print("\nCalculator Menu:")
         print("1. Add")
@@ -46,5 +56,63 @@ def main():
         else:
             print("Invalid choice. Please try again.")
 
+def read_lines(paths):
+    for path in paths:
+        if path == '-':
+            yield from sys.stdin
+        else:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                yield from f
+
+def positive_int(text):
+    """argparse type for counts that must be at least 1"""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return value
+
+def batch(args):
+    out = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    try:
+        _, failed = run_batch(read_lines(args.files or ['-']), out, args.format, args.mode,
+                              args.flush_every, workers=args.workers, chunk_size=args.chunk_size,
+                              deadline=args.deadline, digits=args.digits, exact=args.exact)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 1 if failed else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calculator. Runs the interactive menu unless --batch is given.")
+    parser.add_argument('--batch', action='store_true',
+                        help="evaluate one expression per line from FILEs or stdin")
+    parser.add_argument('files', nargs='*', metavar='FILE', help="input files for --batch ('-' for stdin)")
+    parser.add_argument('--format', choices=FORMATS, default='text', help="output format (default: text)")
+    parser.add_argument('--mode', choices=('rad', 'deg'), default='rad', help="trigonometric mode (default: rad)")
+    parser.add_argument('--output', '-o', help="write results here instead of stdout")
+    parser.add_argument('--flush-every', type=positive_int, default=1000, metavar='N',
+                        help="flush output after every N results (default: 1000)")
+    parser.add_argument('--workers', '-j', type=int, default=1, metavar='N',
+                        help="evaluate in N processes, 0 for one per CPU (default: 1)")
+    parser.add_argument('--chunk-size', type=positive_int, default=1000, metavar='N',
+                        help="lines sent to a worker at a time (default: 1000)")
+    parser.add_argument('--deadline', type=float, metavar='SECONDS',
+                        help="give up on any expression that takes longer than this")
+    arithmetic = parser.add_mutually_exclusive_group()
+    arithmetic.add_argument('--digits', type=int, metavar='N',
+                            help="evaluate in decimal arithmetic to N significant digits")
+    arithmetic.add_argument('--exact', action='store_true',
+                            help="evaluate in exact fractions wherever no transcendental function is used")
+    args = parser.parse_args(argv)
+    if args.digits is not None and args.digits < 1:
+        parser.error("--digits must be at least 1")
+
+    if not args.batch:
+        if args.files:
+            parser.error("input files need --batch")
+        interactive()
+        return 0
+    return batch(args)
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -1,5 +1,6 @@
 import tkinter as tk
 import math
+from engine import evaluate
 
 def create_calculator():
     root = tk.Tk()
@@ -49,7 +50,7 @@ def create_calculator():
             display.insert(tk.END, '**')
         elif char == '%':  # Percentage
             try:
-                result = eval(current)/100
+                result = evaluate(current)/100
                 display.delete(0, tk.END)
                 display.insert(0, str(result))
             except:
@@ -57,14 +58,14 @@ def create_calculator():
                 display.insert(0, "Error")
         elif char == 'M+':  # Memory add
             try:
-                memory += eval(current)
+                memory += evaluate(current)
                 display.delete(0, tk.END)
             except:
                 display.delete(0, tk.END)
                 display.insert(0, "Error")
         elif char == 'M-':  # Memory subtract
             try:
-                memory -= eval(current)
+                memory -= evaluate(current)
                 display.delete(0, tk.END)
             except:
                 display.delete(0, tk.END)
@@ -77,9 +78,8 @@ def create_calculator():
             display.delete(0, tk.END)
         elif char == '=':
             try:
-                # Replace × with *, ÷ with / for eval
-                expression = current.replace('×', '*').replace('÷', '/')
-                result = eval(expression)
+                # The engine maps × and ÷ and closes open parentheses
+                result = evaluate(current)
                 display.delete(0, tk.END)
                 display.insert(0, str(result))
                 calculation_in_progress = True
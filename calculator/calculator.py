@@ -1,9 +1,79 @@
-import re
+import decimal
+import functools
+import multiprocessing
+import queue
 import tkinter as tk
 import math
 from tkinter import messagebox
-from tkinter import ttk
+from tkinter import simpledialog
 from tkinter import PhotoImage
+from engine import Engine, format_result, is_valid_expression
+from factorial import EXACT_DIGITS, factorial_digits, factorial_text
+from display import Result
+import precision
+from pool import EvaluationPool
+from preview import Previewer
+from rational import exact
+from state import CalculatorState
+
+# How often finished background evaluations are checked for, in milliseconds
+RESULT_POLL_MS = 30
+
+# Pause in typing before the preview line is worked out, in milliseconds
+PREVIEW_DELAY_MS = 150
+
+# Largest working precision the precision dialog accepts, in significant digits
+MAX_DIGITS_SETTING = 10000
+
+# Buttons that carry on a calculation from the displayed result
+CONTINUE_BUTTONS = frozenset(['+', '-', '*', '/', 'xʸ', 'Mod', 'x²', '=', '+/-', 'log', 'ln', 'n!', '1/x'])
+
+# Control key bit of a key event's state
+CONTROL_MASK = 0x4
+
+# Keys that press a button, by keysym; Control- is put in front when Ctrl is held
+KEY_BUTTONS = {
+    **{str(num): str(num) for num in range(10)},
+    # Operation keys - use keysym instead of keycode for better compatibility
+    'plus': '+',
+    'minus': '-',
+    'asterisk': '*',
+    'slash': '/',
+    'Return': '=',
+    'BackSpace': '⌫',
+    'Escape': 'C',
+    'period': '.',
+    'parenleft': '(',
+    'parenright': ')',
+    'asciicircum': 'xʸ',
+    'exclam': 'n!',
+    'm': 'Mod',
+    's': 'sin',
+    'c': 'cos',
+    't': 'tan',
+    'l': 'log',
+    'n': 'ln',
+    'q': '√',
+    'p': 'π',
+    'e': 'eˣ',
+    'd': 'D/R',
+    'r': 'ⁿ√',
+    'percent': 'Mod',
+    # Numpad keys
+    'KP_Add': '+',
+    'KP_Subtract': '-',
+    'KP_Multiply': '*',
+    'KP_Divide': '/',
+    'KP_Enter': '=',
+    'KP_Decimal': '.',
+    **{f'KP_{num}': str(num) for num in range(10)},
+    # Memory operation shortcuts
+    'Control-m': 'MC',
+    'Control-r': 'MR',
+    'Control-plus': 'M+',
+    'Control-minus': 'M-',
+    'Control-s': 'MS'
+}
 
 class ToolTip:
     def __init__(self, widget, text_func):
@@ -46,12 +116,23 @@ class Calculator:
         self.root.title("Scientific Calculator")
         self.root.resizable(0, 0)
         
-        # Initialize variables
-        self.memory = 0
-        self.history = []
-        self.current_expression = ""
-        self.last_result = ""
-        self.trig_mode = "rad"  # 'rad' or 'deg'
+        # Everything the calculator knows; the widgets are drawn from it by render()
+        self.state = CalculatorState()
+        # What the widgets show: display edits and length, history length, mode text
+        self._rendered = (self.state.input.edits, 0, 0, self.state.mode_text())
+        self.engine = Engine()
+        self.button_handlers = self.make_button_handlers()
+        
+        # Evaluations run in a worker process so a runaway one can't freeze the window
+        self.pool = EvaluationPool()
+        self.results = queue.Queue()
+        self.pending_results = 0
+        self.busy_future = None  # the evaluation the calculator is waiting for; C cancels it
+        # The running result under the display, worked out in the background
+        self.previewer = Previewer()
+        self.preview_job = None  # after() id of the preview waiting for typing to pause
+        self.preview_future = None  # the preview request whose result is wanted
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # Create display frame
         self.create_display()
@@ -74,6 +155,11 @@ class Calculator:
         # Set the window icon
         self.set_window_icon()
 
+    def on_close(self):
+        self.previewer.close()
+        self.pool.close()
+        self.root.destroy()
+
     def set_window_icon(self):
         """Attempt to set window icon using multiple methods"""
         icon_paths = [
@@ -96,9 +182,11 @@ class Calculator:
                     continue
 
     def create_display(self):
-        # Main display
+        # Main display, with the preview line under it
+        self.display_frame = tk.Frame(self.root)
+        self.display_frame.grid(row=0, column=0, columnspan=6, padx=10, pady=10, sticky="ew")
         self.display = tk.Entry(
-            self.root, 
+            self.display_frame, 
             width=30, 
             font=('Arial', 18), 
             borderwidth=5, 
@@ -108,7 +196,16 @@ class Calculator:
             highlightcolor='gray',
             highlightthickness=1
         )
-        self.display.grid(row=0, column=0, columnspan=6, padx=10, pady=10, sticky="ew")
+        self.display.pack(fill='x')
+        
+        self.preview_label = tk.Label(
+            self.display_frame,
+            text="",
+            font=('Arial', 11),
+            fg='gray',
+            anchor='e'
+        )
+        self.preview_label.pack(fill='x')
         
         # History display
         self.history_label = tk.Label(
@@ -129,11 +226,14 @@ class Calculator:
         
         # Allow history display to receive focus but pass keys to root
         self.history_display.bind('<Key>', lambda e: self.root.focus_set())
+        
+        # Double-click a history line to see every digit of its result
+        self.history_display.bind('<Double-Button-1>', self.expand_history_entry)
 
         # Mode indicator
         self.mode_label = tk.Label(
             self.root,
-            text=f"Mode: {self.trig_mode.upper()}",
+            text=self.state.mode_text(),
             font=('Arial', 10),
             anchor='e'
         )
@@ -150,9 +250,9 @@ class Calculator:
             ('MS', 'Memory Store (Ctrl+S)', 3, 4),
             ('⌫', 'Backspace (Backspace)', 3, 5),
             
-            ('sin', f'sine (s) - Current mode: {self.trig_mode}', 4, 0),
-            ('cos', f'cosine (c) - Current mode: {self.trig_mode}', 4, 1),
-            ('tan', f'tangent (t) - Current mode: {self.trig_mode}', 4, 2),
+            ('sin', f'sine (s) - Current mode: {self.state.trig_mode}', 4, 0),
+            ('cos', f'cosine (c) - Current mode: {self.state.trig_mode}', 4, 1),
+            ('tan', f'tangent (t) - Current mode: {self.state.trig_mode}', 4, 2),
             ('log', 'logarithm base 10 (l)', 4, 3),
             ('ln', 'natural logarithm (n)', 4, 4),
             ('Mod', 'modulo (m)', 5, 5),
@@ -237,7 +337,7 @@ class Calculator:
 
             if text in ['sin', 'cos', 'tan']:
                 # Use lambda to capture current mode
-                tooltip_func = lambda t=text: f"{t} - Current mode: {self.trig_mode.upper()}"
+                tooltip_func = lambda t=text: f"{t} - Current mode: {self.state.trig_mode.upper()}"
                 setattr(self, f'{text}_tooltip', ToolTip(btn, tooltip_func))
             else:
                 setattr(self, f'{text}_tooltip', ToolTip(btn, lambda t=tooltip_text: t))
@@ -252,79 +352,20 @@ class Calculator:
             self.root.grid_columnconfigure(i, weight=1)
     
     def setup_keyboard_bindings(self):
-        # Number keys
-        for num in range(10):
-            self.root.bind(str(num), lambda event, n=str(num): self.on_button_click(n))
-            self.display.bind(str(num), lambda event, n=str(num): self.on_button_click(n))
-        
-        # Operation keys - use keysym instead of keycode for better compatibility
-        key_mappings = {
-            'plus': '+',
-            'minus': '-',
-            'asterisk': '*',
-            'slash': '/',
-            'Return': '=',
-            'BackSpace': '⌫',
-            'Escape': 'C',
-            'period': '.',
-            'parenleft': '(',
-            'parenright': ')',
-            'asciicircum': 'xʸ',
-            'exclam': 'n!',
-            'm': 'Mod',
-            's': 'sin',
-            'c': 'cos',
-            't': 'tan',
-            'l': 'log',
-            'n': 'ln',
-            'q': '√',
-            'p': 'π',
-            'e': 'eˣ',
-            'd': 'D/R',
-            'r': 'ⁿ√',
-            'percent': 'Mod'
-        }
-        
-        for key, value in key_mappings.items():
-            self.root.bind(f'<{key}>', lambda event, v=value: self.on_button_click(v))
-            self.display.bind(f'<{key}>', lambda event, v=value: self.on_button_click(v))
-        
-        # Numpad keys
-        numpad_mappings = {
-            'KP_Add': '+',
-            'KP_Subtract': '-',
-            'KP_Multiply': '*',
-            'KP_Divide': '/',
-            'KP_Enter': '=',
-            'KP_Decimal': '.',
-            'KP_0': '0',
-            'KP_1': '1',
-            'KP_2': '2',
-            'KP_3': '3',
-            'KP_4': '4',
-            'KP_5': '5',
-            'KP_6': '6',
-            'KP_7': '7',
-            'KP_8': '8',
-            'KP_9': '9'
-        }
-        
-        for key, value in numpad_mappings.items():
-            self.root.bind(f'<{key}>', lambda event, v=value: self.on_button_click(v))
-            self.display.bind(f'<{key}>', lambda event, v=value: self.on_button_click(v))
-        
-        # Memory operation shortcuts
-        mem_mappings = {
-            'Control-m': 'MC',
-            'Control-r': 'MR',
-            'Control-plus': 'M+',
-            'Control-minus': 'M-',
-            'Control-s': 'MS'
-        }
-        
-        for key, value in mem_mappings.items():
-            self.root.bind(f'<{key}>', lambda event, v=value: self.on_button_click(v))
-            self.display.bind(f'<{key}>', lambda event, v=value: self.on_button_click(v))
+        # One binding on the window, looked up in a table built once; the
+        # display has no key bindings of its own, so it only changes by render()
+        self.key_handlers = {key: functools.partial(self.on_button_click, text)
+                             for key, text in KEY_BUTTONS.items()}
+        self.key_handlers.update({
+            # Working precision: Ctrl+P asks for the number of digits, Ctrl+F toggles exact fractions
+            'Control-p': self.set_precision,
+            'Control-f': self.toggle_exact,
+            # Full digits of a long result: copy to the clipboard or show in a window
+            'Control-c': self.copy_result,
+            'Control-e': self.expand_result
+        })
+        self.root.bind('<Key>', self.on_key)
+        self.display.bindtags((str(self.display), str(self.root), 'all'))
         
         # Handle focus properly
         self.display.bind('<FocusIn>', self.handle_display_focus)
@@ -333,6 +374,13 @@ class Calculator:
         # Set initial focus
         self.display.focus_set()
 
+    def on_key(self, event):
+        key = 'Control-' + event.keysym if event.state & CONTROL_MASK else event.keysym
+        handler = self.key_handlers.get(key)
+        if handler is not None:
+            handler()
+            return 'break'
+
     def handle_display_focus(self, event=None):
         # When display gets focus, ensure keyboard input works
         self.display.configure(highlightbackground='blue', highlightcolor='blue')
@@ -342,167 +390,89 @@ class Calculator:
         # Visual feedback when display loses focus
         self.display.configure(highlightbackground='gray', highlightcolor='gray')
     
+    @property
+    def current_expression(self):
+        return self.state.text
+
+    def render(self):
+        """Bring the display, history list and mode label up to date with the state"""
+        text_state = self.state.input
+        edits, length, history_length, mode = self._rendered
+        if text_state.edits == edits and len(text_state) >= length:
+            # Only typed at the end since the last render: insert just that
+            added = text_state.since(length)
+            if added:
+                self.display.insert(tk.END, added)
+                self.schedule_preview()
+        else:
+            self.display.delete(0, tk.END)
+            self.display.insert(0, text_state.text)
+            self.schedule_preview()
+        if len(self.state.history) != history_length:
+            self.update_history_display()
+        if self.state.mode_text() != mode:
+            self.update_mode_label()
+            self.schedule_preview()
+        self._rendered = (text_state.edits, len(text_state), len(self.state.history),
+                          self.state.mode_text())
+
+    def make_button_handlers(self):
+        """What each button does, by button text; built once"""
+        state = self.state
+        append = lambda text: functools.partial(state.append, text)
+        handlers = {
+            # Function buttons with auto-completion
+            'sin': append('math.sin('),
+            'cos': append('math.cos('),
+            'tan': append('math.tan('),
+            '√': append('math.sqrt('),
+            'eˣ': append('math.exp('),
+            '|x|': append('abs('),
+            'log': functools.partial(self.handle_logarithm, '10'),
+            'ln': functools.partial(self.handle_logarithm, 'natural'),
+            '=': self.calculate_result,
+            'C': self.clear_display,
+            '⌫': state.backspace,
+            '+/-': state.toggle_sign,
+            'xʸ': state.type_power,
+            'n!': self.handle_factorial,
+            'π': append('math.pi'),
+            'Mod': append('%'),
+            '10ˣ': append('10**'),
+            'x²': append('**2'),
+            '1/x': self.handle_reciprocal,
+            'D/R': self.toggle_trig_mode,
+            'ⁿ√': state.type_nth_root
+        }
+        for char in '0123456789.':
+            handlers[char] = functools.partial(state.type_digit, char)
+        for operator in '+-*/()':
+            handlers[operator] = functools.partial(state.type_operator, operator)
+        for operation in ('MC', 'MR', 'M+', 'M-', 'MS'):
+            handlers[operation] = functools.partial(self.handle_memory_operations, operation)
+        return handlers
+
     def on_button_click(self, button_text):
-        current_display = self.display.get()
-        
         # Clear error if present when new input starts
-        if current_display == "Error":
-            self.clear_display()
-            current_display = ""
+        self.state.clear_error()
 
         try:
-            # Handle function buttons with auto-completion
-            function_map = {
-                'sin': 'math.sin(',
-                'cos': 'math.cos(',
-                'tan': 'math.tan(',
-                'log': 'math.log10(',
-                'ln': 'math.log(',
-                '√': 'math.sqrt(',
-                'eˣ': 'math.exp(',
-                '|x|': 'abs('
-            }
-            
-            
-            if button_text in function_map:
-                if button_text in ['log', 'ln']:
-                    # For log/ln buttons, we'll handle them specially
-                    base = '10' if button_text == 'log' else 'natural'
-                    self.handle_logarithm(base)
-                else:
-                    self.display.insert(tk.END, function_map[button_text])
-                return
-                
-            if button_text.isdigit() or button_text == '.':
-                self.handle_digit_or_decimal(button_text)
-            elif button_text in ['+', '-', '*', '/', '(', ')']:
-                self.handle_operator(button_text)
-            elif button_text == '=':
-                self.calculate_result()
-            elif button_text == 'C':
-                self.clear_display()
-            elif button_text == '⌫':
-                self.backspace()
-            elif button_text == '+/-':
-                self.toggle_sign()
-            elif button_text in ['sin', 'cos', 'tan']:
-                self.handle_trig_function(button_text)
-            elif button_text == 'xʸ':
-                if current_display and not current_display.strip().endswith(('+', '-', '*', '/', '(')):
-                    self.display.insert(tk.END, '**')
-                else:
-                    raise ValueError("Missing base for power operation")
-            elif button_text == 'n!':
-                self.handle_factorial()
-            elif button_text == 'π':
-                self.display.insert(tk.END, 'math.pi')
-            elif button_text == 'Mod':
-                self.display.insert(tk.END, '%')
-            elif button_text == '10ˣ':
-                self.display.insert(tk.END, '10**')
-            elif button_text == 'x²':
-                self.display.insert(tk.END, '**2')
-            elif button_text == '1/x':
-                self.handle_reciprocal()
-            elif button_text == 'D/R':
-                self.toggle_trig_mode()
-            elif button_text in ['MC', 'MR', 'M+', 'M-', 'MS']:
-                self.handle_memory_operations(button_text)
-            elif button_text == 'ⁿ√':
-                self.handle_nth_root()
-            
-            # Update current expression
-            self.current_expression = self.display.get()
-            
-        except Exception as e:
-            self.display.delete(0, tk.END)
-            self.display.insert(0, "Error")
-    
-    def handle_digit_or_decimal(self, char):
-        # Clear error if present
-        if self.display.get() == "Error":
-            self.clear_display()
-
-        # If last result is displayed and user starts typing a number, clear first
-        if self.last_result and self.display.get() == self.last_result:
-            self.display.delete(0, tk.END)
-            self.last_result = ""
-        
-        # Handle decimal point
-        if char == '.':
-            current = self.display.get()
-            # Split the expression into tokens to check for existing decimal in current number
-            tokens = []
-            current_token = ""
-            for c in current:
-                if c in '+-*/%()^':
-                    if current_token:
-                        tokens.append(current_token)
-                        current_token = ""
-                    tokens.append(c)
-                else:
-                    current_token += c
-            if current_token:
-                tokens.append(current_token)
-            
-            # Check if the last token (current number) already has a decimal point
-            if tokens and '.' not in tokens[-1]:
-                self.display.insert(tk.END, char)
-        else:
-            self.display.insert(tk.END, char)
-    
-    def handle_operator(self, operator):
-        # Clear error if present
-        if self.display.get() == "Error":
-            self.clear_display()
+            # A shortened result can't be calculated with; carry on from its exact value
+            if button_text in CONTINUE_BUTTONS:
+                self.state.continue_from_result()
+            self.button_handlers[button_text]()
+        except Exception:
+            self.state.set_error()
+        finally:
+            self.render()
 
-        current = self.display.get()
-        
-        # Handle implicit multiplication for parentheses
-        if operator == '(' and current:
-            last_char = current[-1]
-            if last_char.isdigit() or last_char in ')!π':
-                # Insert multiplication before opening parenthesis
-                self.display.insert(tk.END, '*(')
-                return
-        elif operator == ')' and current:
-            # Check if we need to add closing parenthesis for functions
-            open_count = current.count('(')
-            close_count = current.count(')')
-            if open_count > close_count:
-                # Just add the closing parenthesis
-                self.display.insert(tk.END, ')')
-                return
-        
-        # If last result is displayed and user presses an operator, use it as first operand
-        if self.last_result and self.display.get() == self.last_result:
-            self.display.insert(tk.END, operator)
-            self.last_result = ""
-        else:
-            self.display.insert(tk.END, operator)
-    
     def is_valid_expression(self, expr):
         """Check if expression is mathematically valid"""
-        try:
-            # Check for balanced parentheses
-            if expr.count('(') != expr.count(')'):
-                return False
-                
-            # Check for consecutive operators (but allow ** as power operator)
-            operators = '+-*/%'
-            expr = expr.replace('**', '@')  # Temporary replace ** with @
-            
-            for i in range(len(expr)-1):
-                if expr[i] in operators and expr[i+1] in operators:
-                    return False
-                    
-            return True
-        except:
-            return False
+        return is_valid_expression(expr)
 
     def validate_before_calculation(self):
         """Validate expression before calculation"""
-        expr = self.display.get()
+        expr = self.state.text
         if not expr:
             raise ValueError("Empty expression")
         if not self.is_valid_expression(expr):
@@ -510,321 +480,322 @@ class Calculator:
 
     def safe_eval(self, expression):
         """Safely evaluate mathematical expressions"""
-        allowed_names = {
-            'math': math,
-            'sin': math.sin,
-            'cos': math.cos,
-            'tan': math.tan,
-            'log': math.log,
-            'log10': math.log10,
-            'sqrt': math.sqrt,
-            'exp': math.exp,
-            'abs': abs,
-            'pi': math.pi,
-            'e': math.e,
-            'radians': math.radians,
-            're': re
-        }
-        
-        try:
-            # Replace ^ with ** for power operation
-            expression = expression.replace('^', '**')
-            
-            # Handle empty parentheses cases
-            expression = expression.replace('()', '(0)')
-            
-            # Check for potentially dangerous operations
-            if '__' in expression or ';' in expression:
-                raise ValueError("Invalid expression")
-                
-            # Handle degree mode for trigonometric functions
-            if self.trig_mode == "deg":
-                # This pattern matches trig functions with their arguments
-                pattern = r'(math\.)?(sin|cos|tan)\((.*?)\)'
-                
-                def degree_converter(match):
-                    math_prefix = match.group(1) or ''
-                    func = match.group(2)
-                    arg = match.group(3)
-                    # If the argument already has radians conversion, leave it as is
-                    if 'math.radians(' in arg:
-                        return f"{math_prefix}{func}({arg})"
-                    return f"{math_prefix}{func}(math.radians({arg}))"
-                
-                # Apply the conversion to all trigonometric functions
-                while True:
-                    new_expression = re.sub(pattern, degree_converter, expression)
-                    if new_expression == expression:
-                        break
-                    expression = new_expression
-            
-            # Add math. prefix to known functions if not already present
-            known_funcs = ['sin', 'cos', 'tan', 'log', 'log10', 'sqrt', 'exp', 'abs']
-            for func in known_funcs:
-                # Replace standalone function calls (not preceded by math. or a letter)
-                expression = re.sub(r'(?<![a-zA-Z.])' + func + r'(?=\()', f'math.{func}', expression)
-            
-            # Compile first to check syntax
-            code = compile(expression, '<string>', 'eval')
-            
-            # Check for disallowed operations
-            for name in code.co_names:
-                if name not in allowed_names:
-                    raise ValueError(f"Use of '{name}' not allowed")
-                    
-            return eval(code, {'__builtins__': {}}, allowed_names)
-        except Exception as e:
-            raise ValueError(f"Evaluation error: {str(e)}")
+        return self.engine.safe_eval(expression, self.state.trig_mode)
 
     def show_error(self, message):
         """Display error message in a user-friendly way"""
-        self.display.delete(0, tk.END)
-        self.display.insert(0, "Error")
+        self.state.set_error()
+        self.render()  # before the message box blocks
         messagebox.showerror("Calculation Error", message)
 
     def calculate_result(self):
         try:
-            expression = self.display.get()
-            if not expression:
-                raise ValueError("Empty expression")
-                
-            # Add closing parentheses if needed
-            open_paren = expression.count('(')
-            close_paren = expression.count(')')
-            while open_paren > close_paren:
-                expression += ')'
-                close_paren += 1
-                
-            # Validate the expression
-            if not self.is_valid_expression(expression):
-                raise ValueError("Invalid expression format")
-                
-            expression = expression.replace('×', '*').replace('÷', '/')
-            
-            # Handle implicit multiplication before evaluation
-            expression = self.handle_implicit_multiplication(expression)
-            
-            result = self.safe_eval(expression)
-            
-            # Format result
-            if isinstance(result, float):
-                result = round(result, 10) if not result.is_integer() else int(result)
-            
-            self.display.delete(0, tk.END)
-            self.display.insert(0, str(result))
-            self.history.append(f"{expression} = {result}")
-            self.update_history_display()
-            self.last_result = str(result)
-            
+            expression = self.engine.prepare(self.state.text)
         except Exception as e:
             self.show_error(str(e))
-    
-    def handle_implicit_multiplication(self, expr):
-        """Add multiplication signs for implicit multiplication cases"""
-        # Handle cases like 2(3) -> 2*(3) and 2sin(90) -> 2*sin(90)
-        new_expr = []
-        for i in range(len(expr)):
-            new_expr.append(expr[i])
-            if i < len(expr)-1:
-                # Check if we need to insert multiplication
-                current = expr[i]
-                next_char = expr[i+1]
-                
-                # Cases where we need multiplication:
-                # 1) digit followed by '(' or function name
-                # 2) ')' followed by digit or '(' or function name
-                # 3) constant (π) followed by digit or '(' or function name
-                if (current.isdigit() and (next_char == '(' or next_char.isalpha())) or \
-                (current == ')' and (next_char.isdigit() or next_char == '(' or next_char.isalpha())) or \
-                (current == 'π' and (next_char.isdigit() or next_char == '(' or next_char.isalpha())):
-                    new_expr.append('*')
-        
-        return ''.join(new_expr)
-    
+            return
+
+        state = self.state
+        future = self.pool.submit(expression, state.trig_mode, variables=state.variables(expression),
+                                  digits=state.digits, exact=state.exact)
+        self.run_busy(future, lambda result: state.show_result(expression, result))
+
+    def evaluate_display(self, on_value):
+        """Evaluate the display in the pool and pass its unrounded value to on_value"""
+        state = self.state
+        future = self.pool.submit(state.text, state.trig_mode, places=None, variables=state.variables(state.text),
+                                  digits=state.digits, exact=state.exact)
+        self.run_busy(future, on_value)
+
+    def run_busy(self, future, on_result):
+        """Wait for an evaluation without blocking, showing the calculator busy until it finishes
+
+        Only one evaluation is waited for at a time; starting another
+        cancels it, as C and Esc do.
+        """
+        self.cancel_evaluation()
+        self.busy_future = future
+        if not future.done():
+            self.show_busy(True)
+
+        def finished(handler, value):
+            if future is not self.busy_future:
+                return  # cancelled
+            self.busy_future = None
+            self.show_busy(False)
+            handler(value)
+        self.run_async(future, lambda result: finished(on_result, result),
+                       on_error=lambda message: finished(self.show_error, message))
+
+    def cancel_evaluation(self):
+        if self.busy_future is not None:
+            self.pool.cancel(self.busy_future)
+            self.busy_future = None
+            self.show_busy(False)
+
+    def show_busy(self, busy):
+        self.root.config(cursor='watch' if busy else '')
+        if busy:
+            self.preview_future = None  # drop a preview still on its way
+        self.preview_label.config(text="Calculating... (Esc to cancel)" if busy else "")
+
     def clear_display(self):
-        self.display.delete(0, tk.END)
-        self.last_result = ""
-    
-    def backspace(self):
-        current = self.display.get()
-        if current:
-            self.display.delete(len(current)-1, tk.END)
-    
-    def toggle_sign(self):
-        current = self.display.get()
-        if current:
-            if current[0] == '-':
-                self.display.delete(0)
-            else:
-                self.display.insert(0, '-')
-    
-    def handle_trig_function(self, func):
-        """Handle trigonometric function input based on current mode"""
-        current = self.display.get()
-        
-        # If there's already content and it ends with a number, add multiplication
-        if current and current[-1].isdigit():
-            self.display.insert(tk.END, '*')
-        
-        if self.trig_mode == "deg":
-            self.display.insert(tk.END, f'math.{func}(math.radians(')
-        else:
-            self.display.insert(tk.END, f'math.{func}(')
-        
+        """C and Esc: stop any evaluation in progress and clear the display"""
+        self.cancel_evaluation()
+        self.state.clear()
+
+    def copy_result(self):
+        """Copy the display to the clipboard, with every digit of a shortened result"""
+        text = self.state.result.full_text() if self.state.showing_result() else self.state.text
+        self.root.clipboard_clear()
+        self.root.clipboard_append(text)
+
+    def expand_result(self, result=None):
+        """Show every digit of a result (by default the displayed one) in a window"""
+        if result is None:
+            if not self.state.showing_result():
+                return
+            result = self.state.result
+        window = tk.Toplevel(self.root)
+        window.title("Full result")
+        text = tk.Text(window, width=60, height=15, wrap='char', font=('Courier', 10))
+        scrollbar = tk.Scrollbar(window, command=text.yview)
+        text.configure(yscrollcommand=scrollbar.set)
+        text.insert('1.0', result.full_text())
+        text.configure(state='disabled')
+        scrollbar.pack(side='right', fill='y')
+        text.pack(side='left', fill='both', expand=True)
+
+    def expand_history_entry(self, event=None):
+        selection = self.history_display.curselection()
+        if selection:
+            self.expand_result(self.state.recent_history()[selection[0]].result)
+
+    def schedule_preview(self):
+        """Work out the preview once typing pauses; each key press restarts the wait"""
+        if self.preview_job is not None:
+            self.root.after_cancel(self.preview_job)
+        self.preview_job = self.root.after(PREVIEW_DELAY_MS, self.update_preview)
+
+    def update_preview(self):
+        self.preview_job = None
+        if self.busy_future is not None:
+            return  # the label says "Calculating..." until it finishes
+        state = self.state
+        if state.input.empty or state.input.result or state.input.error:
+            # Nothing typed, or a result the preview would only repeat
+            self.preview_future = None
+            self.show_preview(None, "")
+            return
+        future = self.preview_future = self.previewer.submit(
+            state.text, state.trig_mode, state.variables(state.text), state.digits, state.exact)
+        # Incomplete input fails to evaluate all the time; it just leaves the line blank
+        self.run_async(future, lambda value: self.show_preview(future, Result(value).text),
+                       on_error=lambda message: self.show_preview(future, ""))
+
+    def show_preview(self, future, text):
+        """Show a preview, unless a newer one has been asked for since or the calculator is busy"""
+        if future is not self.preview_future or self.busy_future is not None:
+            return
+        if text == self.state.text:
+            text = ""  # a plain number previews as itself
+        self.preview_label.config(text=f"= {text}" if text else "")
+
+    def run_async(self, future, on_result, on_error=None):
+        """Call on_result on the Tk thread once a pool future finishes
+
+        on_error gets the message if it fails; by default it is shown as an error.
+        """
+        on_error = on_error or self.show_error
+        future.add_done_callback(lambda f: self.results.put((f, on_result, on_error)))
+        self.pending_results += 1
+        if self.pending_results == 1:
+            self.root.after(RESULT_POLL_MS, self.poll_results)
+
+    def poll_results(self):
+        """Hand finished evaluations to their callbacks; keeps polling while any are pending"""
+        while True:
+            try:
+                future, on_result, on_error = self.results.get_nowait()
+            except queue.Empty:
+                break
+            self.pending_results -= 1
+            if future.cancelled():
+                continue  # superseded
+            try:
+                result = future.result()
+            except Exception as e:
+                on_error(str(e))
+                continue
+            on_result(result)
+        self.render()
+
+        if self.pending_results:
+            self.root.after(RESULT_POLL_MS, self.poll_results)
+
     def handle_factorial(self):
+        current = self.state.text
+        if not current:
+            self.show_error("No input for factorial")
+            return
+        self.evaluate_display(lambda num: self.show_factorial(current, num))
+
+    def show_factorial(self, current, num):
         try:
-            current = self.display.get()
-            if not current:
-                raise ValueError("No input for factorial")
-                
-            num = self.safe_eval(current)
-            
-            if num < 0:
-                raise ValueError("Factorial of negative number")
-            if num > 1000:
-                raise ValueError("Number too large for factorial")
-                
-            # Use gamma function for non-integers
-            if not float(num).is_integer():
-                result = math.gamma(num + 1)
-            else:
-                result = math.factorial(int(num))
-                
-            self.display.delete(0, tk.END)
-            self.display.insert(0, str(result))
-            
+            # Integer results small enough to compute exactly become a Result,
+            # so their digits can be copied; anything else is scientific
+            # notation from log-gamma and never overflows
+            if num >= 0 and float(num).is_integer() and factorial_digits(int(num)) <= EXACT_DIGITS:
+                future = self.pool.submit(f"factorial({int(num)})")
+                self.run_busy(future, lambda result: self.state.show_result(f"({current})!", result))
+                return
+            result = factorial_text(num)
+
+            self.state.set_text(result)
+
         except ValueError as ve:
             self.show_error(str(ve))
         except Exception:
             self.show_error("Factorial calculation failed")
-    
-
-    def handle_nth_root(self):
-        current = self.display.get()
-        if not current:
-            # If empty, just insert the root function
-            self.display.insert(tk.END, '**(1/')
-        else:
-            # If there's content, wrap it in parentheses and add root
-            self.display.insert(0, '(')
-            self.display.insert(tk.END, ')**(1/')
 
     def toggle_trig_mode(self):
         """Toggle between degree and radian mode for trigonometric functions"""
-        self.trig_mode = "deg" if self.trig_mode == "rad" else "rad"
-        self.mode_label.config(text=f"Mode: {self.trig_mode.upper()}")
-        
-        # Visual feedback
-        self.mode_label.config(bg='yellow')
-        self.root.after(200, lambda: self.mode_label.config(bg=self.root.cget('bg')))
-        
+        self.state.toggle_trig_mode()
+
         # Update all trigonometric function tooltips
         for func in ['sin', 'cos', 'tan']:
             if hasattr(self, f'{func}_tooltip'):
                 # Update the tooltip function to use current mode
                 tooltip = getattr(self, f'{func}_tooltip')
-                tooltip.text_func = lambda f=func: f"{f} - Current mode: {self.trig_mode.upper()}"
+                tooltip.text_func = lambda f=func: f"{f} - Current mode: {self.state.trig_mode.upper()}"
                 tooltip.hide_tooltip()  # Force tooltip to update next time it's shown
 
+    def update_mode_label(self):
+        self.mode_label.config(text=self.state.mode_text())
+
+        # Visual feedback
+        self.mode_label.config(bg='yellow')
+        self.root.after(200, lambda: self.mode_label.config(bg=self.root.cget('bg')))
+
+    def set_precision(self):
+        """Ask for the working precision; 0 goes back to ordinary floats"""
+        digits = simpledialog.askinteger(
+            "Precision",
+            "Significant digits for decimal mode (0 for ordinary floats):",
+            parent=self.root,
+            initialvalue=self.state.digits or 0,
+            minvalue=0,
+            maxvalue=MAX_DIGITS_SETTING
+        )
+        if digits is None:
+            return  # cancelled
+        self.state.set_digits(digits)
+        self.render()
+
+    def toggle_exact(self):
+        """Switch exact fraction mode on or off; it replaces decimal mode"""
+        self.state.toggle_exact()
+        self.render()
+
     def handle_logarithm(self, base='natural'):
         """Handle logarithmic calculations with proper error checking"""
+        current = self.state.text
+        if not current:
+            self.show_error("No input for logarithm")
+            return
+        self.evaluate_display(lambda value: self.show_logarithm(current, value, base))
+
+    def show_logarithm(self, current, value, base):
         try:
-            current = self.display.get()
-            if not current:
-                raise ValueError("No input for logarithm")
-                
-            value = self.safe_eval(current)
-            
             if value <= 0:
                 raise ValueError("Logarithm is only defined for positive numbers")
-                
+
+            log_type = "ln" if base == 'natural' else "log"
+            if self.state.digits is not None:
+                # Decimal mode works the logarithm out to its precision, like =
+                with decimal.localcontext() as context:
+                    context.prec = self.state.digits
+                    result = precision.log(value) if base == 'natural' else precision.log10(value)
+                self.state.show_result(f"{log_type}({current})", result)
+                return
+
             if base == 'natural':
                 result = math.log(value)
             else:  # base 10
                 result = math.log10(value)
-            
-            # Format result to show 5 decimal places for logarithmic results
-            self.display.delete(0, tk.END)
-            self.display.insert(0, f"{result:.5f}".rstrip('0').rstrip('.') if '.' in f"{result:.5f}" else str(result))
-            
-            # Add to history
-            log_type = "ln" if base == 'natural' else "log"
-            self.history.append(f"{log_type}({current}) = {result}")
-            self.update_history_display()
-            self.last_result = str(result)
-            
+
+            # Format result to show 5 decimal places for logarithmic results, and add to history
+            self.state.show_result(f"{log_type}({current})", result,
+                                   f"{result:.5f}".rstrip('0').rstrip('.') if '.' in f"{result:.5f}" else str(result))
+
         except ValueError as ve:
             self.show_error(str(ve))
         except Exception:
             self.show_error("Logarithm calculation failed")
 
-    
+
 
     def handle_reciprocal(self):
+        current = self.state.text
+        if not current:
+            self.show_error("No input for reciprocal")
+            return
+        self.evaluate_display(lambda value: self.show_reciprocal(current, value))
+
+    def show_reciprocal(self, current, value):
         try:
-            current = self.display.get()
-            if not current:
-                raise ValueError("No input for reciprocal")
-                
-            # Evaluate the current expression
-            value = self.safe_eval(current)
-            
             # Calculate reciprocal
             if value == 0:
                 raise ValueError("Cannot divide by zero")
-                
-            result = 1 / value
-            
+
+            if type(value) is decimal.Decimal:
+                with decimal.localcontext() as context:
+                    context.prec = self.state.digits
+                    result = 1 / value
+            else:
+                result = exact(1 / value)  # a whole Fraction becomes an int
+
             # Format the result nicely
-            if isinstance(result, float):
-                result = round(result, 10) if not result.is_integer() else int(result)
-            
-            self.display.delete(0, tk.END)
-            self.display.insert(0, str(result))
-            
-            # Add to history
-            self.history.append(f"1/({current}) = {result}")
-            self.update_history_display()
-            self.last_result = str(result)
-            
+            result = format_result(result)
+
+            # Show it and add to history
+            self.state.show_result(f"1/({current})", result)
+
         except ValueError as ve:
             self.show_error(str(ve))
         except Exception:
             self.show_error("Reciprocal calculation failed")
-    
+
     def handle_memory_operations(self, operation):
+        current = self.state.text
+        if operation in ('MC', 'MR') or not current:
+            self.store_memory(operation, 0)  # nothing to evaluate
+        elif self.state.showing_result():
+            self.store_memory(operation, self.state.result.value)  # exact, unlike a shortened display
+        else:
+            self.evaluate_display(lambda value: self.store_memory(operation, value))
+
+    def store_memory(self, operation, value):
         try:
-            current = self.display.get()
-            value = self.safe_eval(current) if current else 0
-            
-            if operation == 'MC':
-                self.memory = 0
-            elif operation == 'MR':
-                self.display.delete(0, tk.END)
-                self.display.insert(0, str(self.memory))
-            elif operation == 'M+':
-                self.memory += value
-            elif operation == 'M-':
-                self.memory -= value
-            elif operation == 'MS':
-                self.memory = value
-            
+            self.state.memory_operation(operation, value)
+
             # Show memory stored notification
             if operation != 'MR':
-                messagebox.showinfo("Memory", f"Memory {operation}: {self.memory}")
-        
+                messagebox.showinfo("Memory", f"Memory {operation}: {self.state.memory}")
+
         except ValueError as ve:
             self.show_error(f"Memory operation failed: {str(ve)}")
         except Exception:
             self.show_error("Memory operation failed")
-    
+
     def update_history_display(self):
         self.history_display.delete(0, tk.END)
-        for item in reversed(self.history[-5:]):  # Show last 5 items
-            self.history_display.insert(0, item)
+        for item in reversed(self.state.recent_history()):
+            self.history_display.insert(0, str(item))
 
 # Create and run the calculator
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # evaluation workers in a frozen build
     root = tk.Tk()
     calculator = Calculator(root)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,165 @@
+"""Client and load generator for server.py.
+
+    python client.py "1+2" "sin(30)" --mode deg
+    python client.py --load 20000 --connections 4 --pipeline 32
+
+Both talk to a server started with ``python server.py`` on the same machine
+(pass --unix PATH to use a Unix socket instead of TCP).
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+import time
+
+from server import DEFAULT_HOST, DEFAULT_PORT
+
+LOAD_EXPRESSIONS = [
+    '1+2*3',
+    '(1+2)*(3+4)/5',
+    'sqrt(16)+log10(100)*exp(1)',
+    'sin(30)+cos(60)+tan(45)',
+    '2^10-1',
+    '1/0',
+]
+
+
+class Client:
+    """One connection to the evaluation server; requests may be pipelined"""
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._receiver = asyncio.create_task(self._receive())
+
+    @classmethod
+    async def connect(cls, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        if path:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def request(self, expression, mode='rad', precision=10):
+        """Send one request and return the server's response object"""
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        request = {'id': request_id, 'expression': expression, 'mode': mode, 'precision': precision}
+        self._writer.write(json.dumps(request, ensure_ascii=False).encode() + b'\n')
+        await self._writer.drain()
+        return await future
+
+    async def evaluate(self, expression, mode='rad', precision=10):
+        """Return the result of an expression, raising ValueError with the server's error"""
+        response = await self.request(expression, mode, precision)
+        if 'error' in response:
+            raise ValueError(response['error'])
+        return response['result']
+
+    async def close(self):
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+        self._receiver.cancel()
+
+    async def _receive(self):
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self._pending.pop(response.get('id'), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            # Anything still waiting will never be answered
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection closed by server"))
+            self._pending.clear()
+
+
+async def load_test(total, connections=4, pipeline=32, mode='rad', host=DEFAULT_HOST,
+                    port=DEFAULT_PORT, path=None, expressions=LOAD_EXPRESSIONS):
+    """Send total requests over several connections and return per-request latencies in seconds"""
+    clients = [await Client.connect(host, port, path) for _ in range(connections)]
+    remaining = itertools.count()
+    latencies = []
+
+    async def sender(client, offset):
+        # Each sender keeps one request in flight; pipeline senders share a connection
+        while next(remaining) < total:
+            expression = expressions[(offset + len(latencies)) % len(expressions)]
+            start = time.perf_counter()
+            await client.request(expression, mode)
+            latencies.append(time.perf_counter() - start)
+
+    try:
+        await asyncio.gather(*(sender(client, i) for i, client in enumerate(clients)
+                               for _ in range(pipeline)))
+    finally:
+        for client in clients:
+            await client.close()
+    return latencies
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+async def run(args):
+    if args.load:
+        start = time.perf_counter()
+        latencies = sorted(await load_test(args.load, args.connections, args.pipeline, args.mode,
+                                           args.host, args.port, args.unix))
+        elapsed = time.perf_counter() - start
+        print(f"{len(latencies)} requests over {args.connections} connection(s), "
+              f"{args.pipeline} in flight each")
+        print(f"  throughput  {len(latencies) / elapsed:10.0f} requests/s")
+        for label, fraction in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+            print(f"  {label} latency {percentile(latencies, fraction) * 1e3:10.3f} ms")
+        return 0
+
+    client = await Client.connect(args.host, args.port, args.unix)
+    failed = 0
+    try:
+        responses = await asyncio.gather(*(client.request(expression, args.mode, args.precision)
+                                           for expression in args.expressions))
+        for expression, response in zip(args.expressions, responses):
+            if 'error' in response:
+                failed += 1
+                print(f"{expression} = Error: {response['error']}")
+            else:
+                print(f"{expression} = {response['result']}")
+    finally:
+        await client.close()
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate expressions on a calculator server or load test it.")
+    parser.add_argument('expressions', nargs='*', metavar='EXPRESSION')
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"server address (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"server port (default: {DEFAULT_PORT})")
+    parser.add_argument('--unix', metavar='PATH', help="connect to a Unix socket instead of TCP")
+    parser.add_argument('--mode', choices=('rad', 'deg'), default='rad', help="trigonometric mode (default: rad)")
+    parser.add_argument('--precision', type=int, default=10, help="decimal places in results (default: 10)")
+    parser.add_argument('--load', type=int, metavar='N', help="send N requests and report throughput and latency")
+    parser.add_argument('--connections', type=int, default=4, help="connections for --load (default: 4)")
+    parser.add_argument('--pipeline', type=int, default=32,
+                        help="requests in flight per connection for --load (default: 32)")
+    args = parser.parse_args(argv)
+    if not args.load and not args.expressions:
+        parser.error("give expressions to evaluate or --load N")
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""pi, e, ln 2 and ln 10 to any precision, cached on disk.
+
+Each constant is computed as a fixed-point integer, c * 10**places:
+pi by the Chudnovsky series (about 14 digits a term) and e by the series
+for sum(1/k!), both summed by binary splitting so that the big
+multiplications happen between numbers of similar size. ln 2 and ln 10 come
+from fast-converging atanh formulas whose terms only need divisions by small
+integers, which beat binary splitting at the sizes the calculator uses. The
+integer is written to the cache directory as raw bytes, about 0.42 bytes a
+digit, and read back by later sessions. Asking for more places than are cached recomputes the constant to
+at least twice the cached places, so growing a constant digit by digit
+costs only a constant factor more than computing it once.
+"""
+import decimal
+import math
+import os
+import struct
+import tempfile
+
+GUARD_DIGITS = 10  # places computed beyond those asked for, to absorb rounding
+MIN_PLACES = 100  # nothing smaller is computed or stored
+
+# Set CALCULATOR_CACHE to choose the directory, or to an empty string to keep constants in memory
+CACHE_DIR = os.environ.get('CALCULATOR_CACHE',
+                           os.path.join(os.path.expanduser('~'), '.cache', 'calculator'))
+
+_HEADER = struct.Struct('<Q')  # number of places, then the integer in little-endian bytes
+
+_fixed = {}  # name -> (places, c * 10**places)
+_decimals = {}  # (name, digits) -> Decimal
+
+
+def _chudnovsky_split(a, b):
+    """P, Q and T of the Chudnovsky terms a <= k < b"""
+    if b - a == 1:
+        if a == 0:
+            p = q = 1
+        else:
+            p = (6 * a - 5) * (2 * a - 1) * (6 * a - 1)
+            q = a * a * a * 10939058860032000  # 640320**3 // 24
+        t = p * (13591409 + 545140134 * a)
+        return p, q, -t if a & 1 else t
+    m = (a + b) // 2
+    p1, q1, t1 = _chudnovsky_split(a, m)
+    p2, q2, t2 = _chudnovsky_split(m, b)
+    return p1 * p2, q1 * q2, q2 * t1 + p1 * t2
+
+
+def _pi(places):
+    terms = places // 14 + 2
+    _, q, t = _chudnovsky_split(0, terms)
+    root = math.isqrt(10005 * 10 ** (2 * places))
+    return q * 426880 * root // t
+
+
+def _e_split(a, b):
+    """P, Q with P / Q = sum of a! / k! for a < k <= b"""
+    if b - a == 1:
+        return 1, b
+    m = (a + b) // 2
+    p1, q1 = _e_split(a, m)
+    p2, q2 = _e_split(m, b)
+    return p1 * q2 + p2, q1 * q2
+
+
+def _e(places):
+    # Enough terms that the first one left out is below 10**-places
+    terms = 2
+    while math.lgamma(terms + 1) < places * math.log(10):
+        terms *= 2
+    p, q = _e_split(0, terms)
+    return 10 ** places + 10 ** places * p // q
+
+
+def _atanh_inverse(n, unity):
+    """atanh(1/n) * unity in integer arithmetic"""
+    term = unity // n
+    total = term
+    n2 = n * n
+    k = 1
+    while term:
+        term //= n2
+        k += 2
+        total += term // k
+    return total
+
+
+def _ln2(places):
+    unity = 10 ** places
+    return (18 * _atanh_inverse(26, unity) - 2 * _atanh_inverse(4801, unity)
+            + 8 * _atanh_inverse(8749, unity))
+
+
+def _ln10(places):
+    # ln 10 = 3 ln 2 + ln(5/4), and ln(5/4) = 2 atanh(1/9)
+    return 3 * _ln2(places) + 2 * _atanh_inverse(9, 10 ** places)
+
+
+_SERIES = {'pi': _pi, 'e': _e, 'ln2': _ln2, 'ln10': _ln10}
+
+
+def _path(name):
+    return os.path.join(CACHE_DIR, f'{name}.bin')
+
+
+def _load(name):
+    """(places, fixed) from the disk cache, or None if it is missing or unreadable"""
+    if not CACHE_DIR:
+        return None
+    try:
+        with open(_path(name), 'rb') as f:
+            data = f.read()
+        places, = _HEADER.unpack_from(data)
+    except (OSError, struct.error):
+        return None
+    return places, int.from_bytes(data[_HEADER.size:], 'little')
+
+
+def _save(name, places, fixed):
+    """Write a constant to the disk cache; failures only cost a recomputation later"""
+    if not CACHE_DIR:
+        return
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # Write then rename, so a reader never sees half a file
+        fd, temporary = tempfile.mkstemp(dir=CACHE_DIR, prefix=f'.{name}.')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(places))
+            f.write(fixed.to_bytes((fixed.bit_length() + 7) // 8, 'little'))
+        os.replace(temporary, _path(name))
+    except OSError:
+        pass
+
+
+def fixed_point(name, places):
+    """The constant name times 10**places as an integer, good to within one unit"""
+    cached = _fixed.get(name) or _load(name)
+    if cached is None or cached[0] < places:
+        # Grow by at least doubling, so repeated small increases stay cheap
+        grown = max(places, MIN_PLACES, 2 * cached[0] if cached else 0)
+        fixed = _SERIES[name](grown + GUARD_DIGITS) // 10 ** GUARD_DIGITS
+        cached = grown, fixed
+        _save(name, *cached)
+    _fixed[name] = cached
+    stored, fixed = cached
+    if stored == places:
+        return fixed
+    return fixed // 10 ** (stored - places)
+
+
+def constant(name, digits):
+    """The constant name ('pi', 'e', 'ln2' or 'ln10') to digits significant digits"""
+    value = _decimals.get((name, digits))
+    if value is None:
+        places = digits + GUARD_DIGITS
+        context = decimal.Context(prec=digits, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+        value = decimal.Decimal(fixed_point(name, places)).scaleb(-places, context)
+        _decimals[(name, digits)] = value
+    return value
+
+
+def pi(digits):
+    return constant('pi', digits)
+
+
+def e(digits):
+    return constant('e', digits)
+
+
+def ln2(digits):
+    return constant('ln2', digits)
+
+
+def ln10(digits):
+    return constant('ln10', digits)
@@ -0,0 +1,314 @@
+"""Static cost estimates for checked expression trees.
+
+Nothing is evaluated: every node gets an upper bound on log10 of its
+magnitude, worked out from the bounds of its operands. Expressions that only
+ever see floats and small integers take the float path, ones that build big
+integers take the big-integer path, and ones whose result or multiplication
+work would exceed the limits are rejected up front with a clear message.
+"""
+import ast
+import math
+
+from factorial import log10_factorial
+
+FLOAT_PATH = 'float'  # floats and small integers; every operation is O(1)
+BIG_INTEGER_PATH = 'bigint'
+
+MAX_DIGITS = 1_000_000  # largest integer an expression may build, in decimal digits
+SMALL_DIGITS = 100  # integers up to this size cost about as much as floats
+MAX_WORK = 4.0  # multiplication work allowed, in multiplies of two MAX_DIGITS integers
+KARATSUBA = math.log2(3)  # big-integer multiplication time grows as digits ** 1.585
+LOG10_2 = math.log10(2)
+
+
+class Cost:
+    """What an expression will cost: its path, largest integer in digits and work
+
+    kind is the inferred type of the result: 'int' when every operation
+    keeps to integers, 'fraction' for exact fractions, 'float', or None when
+    it can't be told in advance.
+    """
+
+    __slots__ = ('path', 'digits', 'work', 'kind')
+
+    def __init__(self, path, digits, work, kind=None):
+        self.path = path
+        self.digits = digits
+        self.work = work
+        self.kind = kind
+
+    def __repr__(self):
+        return f"Cost(path={self.path!r}, digits={self.digits:.0f}, work={self.work:.3g}, kind={self.kind!r})"
+
+
+class Bound:
+    """Upper bound on a value: its type, log10 of its magnitude and its sign if known
+
+    For a fraction, digits bounds both its numerator and its denominator.
+    """
+
+    __slots__ = ('kind', 'digits', 'sign')
+
+    def __init__(self, kind, digits, sign=None):
+        self.kind = kind  # 'int', 'fraction', 'float' or None when nothing is known
+        self.digits = digits
+        self.sign = sign  # 1 for >= 0, -1 for <= 0, None if unknown
+
+
+FLOAT = Bound('float', 309)
+UNKNOWN = Bound(None, math.inf)
+
+# Results of the allowed functions; anything else is treated as unknown
+FLOAT_FUNCTIONS = frozenset({
+    'sin', 'cos', 'tan', 'log', 'log10', 'sqrt', 'exp', 'radians',
+    'sin_deg', 'cos_deg', 'tan_deg', 'root'
+})
+FLOAT_NAMES = frozenset({'pi', 'e'})
+# Functions that build exact fractions in rational mode (see rational.py)
+FRACTION_FUNCTIONS = frozenset({'divide', 'Fraction'})
+
+
+# Kinds whose values are exact, so their size is bounded like an integer's
+EXACT_KINDS = frozenset({'int', 'fraction'})
+
+
+def _int_digits(value):
+    if value == 0:
+        return 0.0
+    return math.log10(value) if value.bit_length() < 1000 else value.bit_length() * LOG10_2
+
+
+def _describe(digits):
+    if digits == math.inf:
+        return "Result too large: far beyond any integer that fits in memory"
+    return f"Result too large: about {math.ceil(digits):,} digits"
+
+
+class _Estimator:
+    """Bound every node of a tree, tracking the largest integer and total work"""
+
+    def __init__(self, max_digits):
+        self.max_digits = max_digits
+        self.largest = 0.0
+        self.work = 0.0
+        self.unknown = False
+
+    def visit(self, node):
+        method = self._dispatch.get(type(node))
+        if method is None:
+            self.unknown = True
+            return UNKNOWN
+        return method(self, node)
+
+    def integer(self, digits, sign=None, multiply=False):
+        """Record an integer result, raising ValueError if it is too large"""
+        if digits > self.max_digits:
+            raise ValueError(_describe(digits))
+        self.largest = max(self.largest, digits)
+        if multiply and digits > SMALL_DIGITS:
+            self.work += (digits / self.max_digits) ** KARATSUBA
+            if self.work > MAX_WORK:
+                raise ValueError("Expression too expensive: too many large multiplications")
+        return Bound('int', digits, sign)
+
+    def fraction(self, digits, sign=None, multiply=False):
+        """Record an exact fraction whose numerator and denominator have at most digits digits"""
+        self.integer(digits, sign, multiply)
+        return Bound('fraction', digits, sign)
+
+    def visit_Expression(self, node):
+        return self.visit(node.body)
+
+    def visit_Constant(self, node):
+        if type(node.value) is int:
+            return self.integer(_int_digits(node.value), 1)
+        return Bound('float', FLOAT.digits, 1 if node.value >= 0 else -1)
+
+    def visit_Name(self, node):
+        if node.id in FLOAT_NAMES:
+            return Bound('float', FLOAT.digits, 1)
+        self.unknown = True
+        return UNKNOWN
+
+    def visit_UnaryOp(self, node):
+        operand = self.visit(node.operand)
+        if isinstance(node.op, ast.USub) and operand.sign is not None:
+            return Bound(operand.kind, operand.digits, -operand.sign)
+        return operand
+
+    def visit_Call(self, node):
+        name = node.func.id
+        if name == 'Decimal' and len(node.args) == 1 and isinstance(node.args[0], ast.Constant):
+            return self.decimal_literal(node.args[0].value)
+        args = [self.visit(arg) for arg in node.args]
+        if name in FLOAT_FUNCTIONS:
+            return FLOAT
+        if name == 'abs' and len(args) == 1:
+            return Bound(args[0].kind, args[0].digits, 1)
+        if name == 'powmod' and len(args) == 3:
+            return self.powmod(*args)
+        if name == 'factorial' and len(args) == 1:
+            return self.factorial(args[0])
+        if name == 'mod' and len(args) == 2:
+            return self.binary(ast.Mod, *args)
+        if name == 'pow' and len(args) == 2:
+            return self.binary(ast.Pow, *args)
+        if name == 'power' and len(args) == 2:
+            return self.power(*args, exact=True)
+        if name in FRACTION_FUNCTIONS and len(args) in (1, 2):
+            return self.exact_divide(*args)
+        self.unknown = True
+        return UNKNOWN
+
+    def visit_BinOp(self, node):
+        return self.binary(type(node.op), self.visit(node.left), self.visit(node.right))
+
+    def binary(self, operator, left, right):
+        if left.kind is None or right.kind is None:
+            return UNKNOWN
+        return self._operators[operator](self, left, right)
+
+    def decimal_literal(self, text):
+        """Decimal('...') of decimal mode: a whole number is bounded like an int literal"""
+        try:
+            value = int(text)
+        except (TypeError, ValueError):
+            return Bound('float', FLOAT.digits, 1)
+        return self.integer(_int_digits(value), 1)
+
+    def add(self, left, right):
+        if left.kind == right.kind == 'int':
+            sign = left.sign if left.sign == right.sign else None
+            return self.integer(max(left.digits, right.digits) + LOG10_2, sign)
+        if _exact(left, right):
+            # p/q + r/s = (ps + rq) / qs
+            return self.fraction(left.digits + right.digits + LOG10_2, multiply=True)
+        return FLOAT
+
+    def subtract(self, left, right):
+        if left.kind == right.kind == 'int':
+            sign = left.sign if right.sign is not None and left.sign == -right.sign else None
+            return self.integer(max(left.digits, right.digits) + LOG10_2, sign)
+        if _exact(left, right):
+            return self.fraction(left.digits + right.digits + LOG10_2, multiply=True)
+        return FLOAT
+
+    def multiply(self, left, right):
+        if left.kind == right.kind == 'int':
+            return self.integer(left.digits + right.digits, _sign_product(left, right), multiply=True)
+        if _exact(left, right):
+            return self.fraction(left.digits + right.digits, _sign_product(left, right), multiply=True)
+        return FLOAT
+
+    def divide(self, left, right):
+        return FLOAT
+
+    def exact_divide(self, left, right=None):
+        """divide(a, b) or Fraction(a, b) of rational mode: p/q / (r/s) = ps / qr"""
+        if right is None:
+            right = Bound('int', 0.0, 1)
+        if left.kind is None or right.kind is None:
+            self.unknown = True
+            return UNKNOWN
+        if _exact(left, right):
+            return self.fraction(left.digits + right.digits, _sign_product(left, right), multiply=True)
+        return FLOAT
+
+    def floor_divide(self, left, right):
+        if left.kind == right.kind == 'int':
+            return self.integer(left.digits, _sign_product(left, right))
+        if _exact(left, right):
+            return self.integer(left.digits + right.digits, _sign_product(left, right))
+        return FLOAT
+
+    def modulo(self, left, right):
+        # The remainder is smaller than the divisor and takes its sign
+        if left.kind == right.kind == 'int':
+            return self.integer(right.digits, right.sign)
+        if _exact(left, right):
+            return self.fraction(left.digits + right.digits, right.sign, multiply=True)
+        return FLOAT
+
+    def power(self, base, exponent, exact=False):
+        """base ** exponent; exact is rational mode's power(), where int ** negative int is a fraction"""
+        # A fraction exponent may be whole, e.g. 10/2, so it is bounded like an int
+        if base.kind not in EXACT_KINDS or exponent.kind not in EXACT_KINDS:
+            return FLOAT
+        if base.kind == 'int' and exponent.sign == -1 and not exact:
+            return FLOAT  # int ** negative int is a float no larger than 1
+        if base.kind == 'int' and base.digits == 0:
+            return self.integer(0.0)  # 0, 1 and -1 stay that size
+        # The exponent is at most 10 ** exponent.digits; a fraction's numerator
+        # and denominator each grow by that factor
+        digits = math.inf if exponent.digits > 300 else max(base.digits, LOG10_2) * 10 ** exponent.digits
+        sign = 1 if base.sign == 1 else None
+        if base.kind == 'int' and exponent.kind == 'int' and exponent.sign != -1:
+            return self.integer(digits, sign, multiply=True)
+        return self.fraction(digits, sign, multiply=True)
+
+    def powmod(self, base, exponent, modulus):
+        if None in (base.kind, exponent.kind, modulus.kind):
+            self.unknown = True
+            return UNKNOWN
+        if base.kind == exponent.kind == modulus.kind == 'int':
+            if exponent.sign == -1:
+                return FLOAT
+            # Square and multiply: two products of modulus-sized numbers per exponent bit
+            bits = exponent.digits / LOG10_2 + 1
+            digits = 2 * modulus.digits
+            if digits > SMALL_DIGITS:
+                self.work += bits * 2 * (digits / self.max_digits) ** KARATSUBA
+                if self.work > MAX_WORK:
+                    raise ValueError("Expression too expensive: too many large multiplications")
+            return self.integer(modulus.digits, modulus.sign)
+        # Anything else falls back to ** and %
+        self.power(base, exponent)
+        return FLOAT
+
+    def factorial(self, n):
+        if n.kind in EXACT_KINDS:  # rational mode's factorial takes a whole fraction as an int
+            digits = math.inf if n.digits > 15 else log10_factorial(10 ** n.digits)
+            return self.integer(digits, 1, multiply=True)
+        if n.kind is None:
+            self.unknown = True
+            return UNKNOWN
+        return FLOAT  # non-integers go through gamma
+
+
+def _exact(left, right):
+    """True if both sides are ints or fractions, so the result is exact"""
+    return left.kind in EXACT_KINDS and right.kind in EXACT_KINDS
+
+
+def _sign_product(left, right):
+    if left.sign is None or right.sign is None:
+        return None
+    return left.sign * right.sign
+
+
+# Node type -> visitor and operator type -> bound rule, built once
+_Estimator._dispatch = {
+    getattr(ast, name[len('visit_'):]): method
+    for name, method in vars(_Estimator).items()
+    if name.startswith('visit_')
+}
+_Estimator._operators = {
+    ast.Add: _Estimator.add,
+    ast.Sub: _Estimator.subtract,
+    ast.Mult: _Estimator.multiply,
+    ast.Div: _Estimator.divide,
+    ast.FloorDiv: _Estimator.floor_divide,
+    ast.Mod: _Estimator.modulo,
+    ast.Pow: _Estimator.power,
+}
+
+
+def estimate_cost(tree, max_digits=MAX_DIGITS):
+    """Return the Cost of a checked tree, raising ValueError if it is too expensive"""
+    estimator = _Estimator(max_digits)
+    result = estimator.visit(tree)
+    if estimator.unknown or estimator.largest > SMALL_DIGITS:
+        path = BIG_INTEGER_PATH
+    else:
+        path = FLOAT_PATH
+    return Cost(path, estimator.largest, estimator.work, result.kind)
@@ -0,0 +1,57 @@
+"""Display model for results.
+
+A Result keeps the exact value of an evaluation and renders only the short
+text the display shows; every digit is produced on demand, for copying or
+the expanded view, and never stored. History entries hold a reference to
+their Result rather than a string, so a 1000! in history costs its int, not
+two copies of its 2568 digits.
+
+When a result is too long to show exactly, continuing a calculation from it
+puts Ans in the display instead of the shortened digits, and Ans is bound to
+the exact value when the expression is evaluated.
+"""
+from formatting import format_number, is_shortened
+
+ANS = 'Ans'
+
+
+class Result:
+    """An exact result and the short text it is displayed as"""
+
+    __slots__ = ('value', '_text')
+
+    def __init__(self, value):
+        self.value = value
+        self._text = None
+
+    @property
+    def text(self):
+        """The display text, rendered the first time it is asked for"""
+        if self._text is None:
+            self._text = format_number(self.value)
+        return self._text
+
+    @property
+    def truncated(self):
+        """True if the display text does not show every digit"""
+        return is_shortened(self.value)
+
+    def full_text(self):
+        """Every digit of the value; built each time rather than kept"""
+        return format_number(self.value, full=True)
+
+    def __str__(self):
+        return self.text
+
+
+class HistoryEntry:
+    """One line of history: the expression and a reference to its result"""
+
+    __slots__ = ('expression', 'result')
+
+    def __init__(self, expression, result):
+        self.expression = expression
+        self.result = result
+
+    def __str__(self):
+        return f"{self.expression} = {self.result.text}"
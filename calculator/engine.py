@@ -0,0 +1,485 @@
+"""Headless expression engine shared by the calculator front ends.
+
+Nothing in this module imports tkinter, so the evaluation pipeline used by
+the GUI can also be driven from scripts, batch jobs and benchmarks.
+"""
+import ast
+import math
+import threading
+from collections import OrderedDict
+
+from cost import FLOAT_PATH, MAX_DIGITS, estimate_cost
+from factorial import factorial
+from tokenizer import CONSTANTS, to_source, tokenize
+
+_numpy = False  # not imported yet; None once it turns out to be missing
+
+
+def load_numpy():
+    """NumPy, imported the first time array mode needs it; None if it isn't installed"""
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:  # array mode falls back to a Python loop
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+def sin_deg(x):
+    """Sine of an angle in degrees"""
+    return math.sin(math.radians(x % 360))
+
+
+def cos_deg(x):
+    """Cosine of an angle in degrees"""
+    return math.cos(math.radians(x % 360))
+
+
+def tan_deg(x):
+    """Tangent of an angle in degrees"""
+    return math.tan(math.radians(x % 360))
+
+
+def powmod(base, exponent, modulus):
+    """base ** exponent % modulus, without building base ** exponent for integers"""
+    if type(base) is int and type(exponent) is int and type(modulus) is int and exponent >= 0:
+        if not modulus:
+            raise ZeroDivisionError("integer modulo by zero")
+        return pow(base, exponent, modulus)
+    return base ** exponent % modulus
+
+
+# Names an expression is allowed to reference. The tokenizer strips the math.
+# prefix, so the display text can use either spelling.
+ALLOWED_NAMES = {
+    'sin': math.sin,
+    'cos': math.cos,
+    'tan': math.tan,
+    'log': math.log,
+    'log10': math.log10,
+    'sqrt': math.sqrt,
+    'exp': math.exp,
+    'abs': abs,
+    'pi': math.pi,
+    'e': math.e,
+    'radians': math.radians,
+    'sin_deg': sin_deg,
+    'cos_deg': cos_deg,
+    'tan_deg': tan_deg,
+    'powmod': powmod,
+    'factorial': factorial
+}
+
+# Trig functions and the degree-mode versions they resolve to
+DEGREE_FUNCS = {'sin': 'sin_deg', 'cos': 'cos_deg', 'tan': 'tan_deg'}
+
+# Operators an expression may use; anything else is rejected before compiling
+BINARY_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+UNARY_OPERATORS = (ast.UAdd, ast.USub)
+
+
+def is_valid_expression(expr):
+    """Check if expression is mathematically valid"""
+    try:
+        to_source(tokenize(expr), close=False)
+        return True
+    except ValueError:
+        return False
+
+
+def _array_factorial(x):
+    try:
+        return math.gamma(x + 1)
+    except (ValueError, OverflowError):
+        return math.nan if x < 0 else math.inf
+
+
+def format_result(result, places=10):
+    """Round floats to places decimals for display and turn whole floats into ints"""
+    if isinstance(result, float):
+        result = round(result, places) if not result.is_integer() else int(result)
+    return result
+
+
+_array_names = None
+
+
+def array_names():
+    """Return the allowed-names table with NumPy ufuncs in place of math functions"""
+    global _array_names
+    if _array_names is None:
+        numpy = load_numpy()
+        if numpy is None:
+            raise ImportError("Array mode needs NumPy")
+
+        def log(x, base=None):
+            return numpy.log(x) if base is None else numpy.log(x) / numpy.log(base)
+
+        _array_names = {
+            'sin': numpy.sin,
+            'cos': numpy.cos,
+            'tan': numpy.tan,
+            'log': log,
+            'log10': numpy.log10,
+            'sqrt': numpy.sqrt,
+            'exp': numpy.exp,
+            'abs': numpy.abs,
+            'pi': numpy.pi,
+            'e': numpy.e,
+            'radians': numpy.radians,
+            'sin_deg': lambda x: numpy.sin(numpy.radians(x % 360)),
+            'cos_deg': lambda x: numpy.cos(numpy.radians(x % 360)),
+            'tan_deg': lambda x: numpy.tan(numpy.radians(x % 360)),
+            'powmod': powmod,
+            'factorial': numpy.vectorize(_array_factorial, otypes=[float])
+        }
+    return _array_names
+
+
+def literal_text(source, node):
+    """The text a literal was parsed from, given the source as UTF-8 bytes
+
+    ast.get_source_segment splits the whole source into lines on every
+    call; expressions are a single line, so a slice does the same job.
+    """
+    if node.lineno == node.end_lineno == 1:
+        return source[node.col_offset:node.end_col_offset].decode()
+    return ast.get_source_segment(source.decode(), node)
+
+
+class _Rewriter:
+    """Check an expression tree against the whitelist and apply the calculator's rewrites"""
+
+    def __init__(self, allowed_names, trig_mode):
+        self.allowed_names = allowed_names
+        self.trig_mode = trig_mode
+
+    def visit(self, node):
+        method = self._dispatch.get(type(node))
+        if method is None:
+            raise ValueError(f"Unsupported syntax: {type(node).__name__}")
+        return method(self, node)
+
+    def visit_Expression(self, node):
+        node.body = self.visit(node.body)
+        return node
+
+    def visit_BinOp(self, node):
+        if not isinstance(node.op, BINARY_OPERATORS):
+            raise ValueError(f"Unsupported operator: {type(node.op).__name__}")
+        node.left = self.visit(node.left)
+        node.right = self.visit(node.right)
+
+        # a ** b % m becomes powmod(a, b, m), which uses three-argument pow
+        # instead of building a ** b when everything is an integer
+        if (isinstance(node.op, ast.Mod) and isinstance(node.left, ast.BinOp)
+                and isinstance(node.left.op, ast.Pow) and 'powmod' in self.allowed_names):
+            return self._call('powmod', [node.left.left, node.left.right, node.right], node)
+        return node
+
+    def visit_UnaryOp(self, node):
+        if not isinstance(node.op, UNARY_OPERATORS):
+            raise ValueError(f"Unsupported operator: {type(node.op).__name__}")
+        node.operand = self.visit(node.operand)
+        return node
+
+    def visit_Constant(self, node):
+        if type(node.value) not in (int, float):
+            raise ValueError(f"Unsupported value: {node.value!r}")
+        return node
+
+    def visit_Name(self, node):
+        if node.id not in self.allowed_names:
+            raise ValueError(f"Use of '{node.id}' not allowed")
+        return node
+
+    def visit_Call(self, node):
+        if node.keywords:
+            raise ValueError("Keyword arguments not allowed")
+        func = self.visit(node.func)
+        if not isinstance(func, ast.Name):
+            raise ValueError("Only named functions can be called")
+        node.func = func
+        node.args = [self.visit(arg) for arg in node.args]
+
+        # Degree mode swaps in the degree-aware function unless the argument
+        # already is radians(...), so it costs no more than radian mode
+        if self.trig_mode == "deg" and func.id in DEGREE_FUNCS and len(node.args) == 1:
+            arg = node.args[0]
+            if not (isinstance(arg, ast.Call) and arg.func.id == 'radians'):
+                func.id = DEGREE_FUNCS[func.id]
+        return node
+
+    def _call(self, name, args, node):
+        """A call of the allowed name with args, placed where node was"""
+        func = ast.copy_location(ast.Name(id=name, ctx=ast.Load()), node)
+        return ast.copy_location(ast.Call(func=func, args=args, keywords=[]), node)
+
+
+# Node type -> visitor, so dispatch is a single dict lookup
+_Rewriter._dispatch = {
+    getattr(ast, name[len('visit_'):]): method
+    for name, method in vars(_Rewriter).items()
+    if name.startswith('visit_')
+}
+
+
+class Engine:
+    """Evaluate calculator expressions without a GUI"""
+
+    def __init__(self, trig_mode="rad", allowed_names=None, cache_size=256, max_digits=MAX_DIGITS):
+        self.trig_mode = trig_mode  # 'rad' or 'deg'
+        self.cache_size = cache_size  # 0 disables the code cache
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()  # engines may be shared between threads
+        self._max_digits = max_digits
+        self.allowed_names = ALLOWED_NAMES if allowed_names is None else allowed_names
+
+    @property
+    def allowed_names(self):
+        return self._allowed_names
+
+    @allowed_names.setter
+    def allowed_names(self, names):
+        # Cached code was checked against the old table, so drop it
+        self._allowed_names = dict(names)
+        self.clear_cache()
+
+    @property
+    def max_digits(self):
+        """Largest integer, in decimal digits, an expression may build"""
+        return self._max_digits
+
+    @max_digits.setter
+    def max_digits(self, digits):
+        # Cached code passed the old limit
+        self._max_digits = digits
+        self.clear_cache()
+
+    def update_allowed_names(self, **names):
+        """Add or replace names expressions may use"""
+        self.allowed_names = {**self._allowed_names, **names}
+
+    def clear_cache(self):
+        """Forget every compiled expression"""
+        with self._cache_lock:
+            self._cache.clear()
+
+    def cache_info(self):
+        """Return cache statistics as a dict"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._cache),
+            'max_size': self.cache_size
+        }
+
+    def prepare(self, expression):
+        """Turn display text into the normalised expression shown in history"""
+        if not expression:
+            raise ValueError("Empty expression")
+        return to_source(tokenize(expression))
+
+    def compile(self, expression, trig_mode=None, variables=()):
+        """Return checked code for an expression, reusing cached code when possible
+
+        variables names free variables the expression may use besides the
+        allowed-names table; the caller binds them when evaluating.
+        """
+        return self._lookup(expression, trig_mode, variables)[0]
+
+    def estimate(self, expression, trig_mode=None):
+        """Return the cost.Cost of an expression, raising ValueError if it is too expensive"""
+        return self._lookup(expression, trig_mode, ())[1]
+
+    def _lookup(self, expression, trig_mode, variables):
+        key = (expression, trig_mode or self.trig_mode, tuple(variables))
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                return entry
+            self.misses += 1
+
+        entry = self._compile(*key)
+        if self.cache_size > 0:
+            with self._cache_lock:
+                self._cache[key] = entry
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return entry
+
+    def _compile(self, expression, trig_mode, variables):
+        """Return (code, cost, value) for an expression; the cost check runs before anything is evaluated
+
+        value is the result of an integer expression on the float path,
+        worked out now and cached with the code, and None otherwise. Bigger
+        ones are left to evaluation time: compiling happens wherever the cost
+        is estimated, which may be the window's thread.
+        """
+        tree = self._parse(expression, trig_mode, variables)
+        cost = estimate_cost(tree, self._max_digits)
+        code = compile(tree, '<expression>', 'eval')
+        if cost.kind == 'int' and cost.path == FLOAT_PATH and not variables:
+            return code, cost, self._fold(code)
+        return code, cost, None
+
+    def _fold(self, code):
+        """The int an integer expression evaluates to, or None to leave it to evaluation time"""
+        try:
+            value = eval(code, {'__builtins__': {}}, self._allowed_names)
+        except Exception:
+            return None  # e.g. 1 % 0; evaluating again reports the error as usual
+        # The inference trusts the allowed names; check what they really returned
+        return value if type(value) is int else None
+
+    def _parse(self, expression, trig_mode, variables=()):
+        """Tokenize, parse and check an expression, returning the rewritten tree"""
+        names = self._allowed_names
+        constants = CONSTANTS
+        if variables:
+            for name in variables:
+                if name in names:
+                    raise ValueError(f"Variable '{name}' shadows a built-in name")
+            names = names.keys() | set(variables)
+            constants = constants | set(variables)
+
+        source = to_source(tokenize(expression, constants))
+        try:
+            tree = ast.parse(source, mode='eval')
+        except SyntaxError:
+            raise ValueError("Invalid syntax")
+
+        return self._rewrite(tree, source, names, trig_mode)
+
+    def _rewrite(self, tree, source, names, trig_mode):
+        """Check and rewrite a parsed tree
+
+        source is the text it was parsed from. The float engine doesn't need
+        it; it is a hook for subclasses whose rewriters read literals as
+        typed, such as the decimal and rational engines.
+        """
+        return _Rewriter(names, trig_mode).visit(tree)
+
+    def compile_function(self, expression, variables=(), trig_mode=None):
+        """Compile an expression into a plain function of its variables
+
+        The expression is parsed and checked once; calling the result only
+        evaluates it. Arithmetic errors such as ZeroDivisionError propagate
+        unchanged so hot loops pay nothing for error handling.
+        """
+        variables = tuple(variables)
+        try:
+            tree = self._parse(expression, trig_mode or self.trig_mode, variables)
+            estimate_cost(tree, self._max_digits)
+        except Exception as e:
+            raise ValueError(f"Evaluation error: {str(e)}")
+
+        arguments = ast.arguments(posonlyargs=[], args=[ast.arg(arg=name) for name in variables],
+                                  kwonlyargs=[], kw_defaults=[], defaults=[])
+        lambda_tree = ast.Expression(body=ast.Lambda(args=arguments, body=tree.body))
+        code = compile(ast.fix_missing_locations(lambda_tree), '<expression>', 'eval')
+
+        # The allowed names become the function's globals
+        namespace = dict(self._allowed_names)
+        namespace['__builtins__'] = {}
+        function = eval(code, namespace)
+        function.__name__ = function.__qualname__ = 'compiled_expression'
+        function.expression = expression
+        function.variables = variables
+        return function
+
+    def safe_eval(self, expression, trig_mode=None, variables=None):
+        """Safely evaluate mathematical expressions
+
+        variables optionally maps extra names, such as the display's Ans, to
+        their values.
+        """
+        try:
+            if variables:
+                code = self.compile(expression, trig_mode, tuple(variables))
+                return eval(code, {'__builtins__': {}}, {**self._allowed_names, **variables})
+            code, _, value = self._lookup(expression, trig_mode, ())
+            if value is not None:
+                return value  # an integer expression, already worked out
+            return eval(code, {'__builtins__': {}}, self._allowed_names)
+        except MemoryError:
+            raise ValueError("Evaluation error: out of memory")
+        except Exception as e:
+            raise ValueError(f"Evaluation error: {str(e)}")
+
+    def evaluate(self, expression, trig_mode=None, places=10, variables=None):
+        """Run the same pipeline as the '=' button and return the formatted result
+
+        places=None returns the result unrounded, for callers that work on with it.
+        """
+        if not expression:
+            raise ValueError("Empty expression")
+        result = self.safe_eval(expression, trig_mode, variables)
+        if type(result) is int or places is None:
+            return result  # integers are exact; there is nothing to round
+        return format_result(result, places)
+
+    def evaluate_array(self, expression, values, trig_mode=None, variable='x'):
+        """Evaluate an expression once for every value bound to variable
+
+        With NumPy installed this is a single vectorised pass returning an
+        array; otherwise the compiled code runs in a Python loop and a list is
+        returned. Either way the results are floats, and points outside a
+        function's domain or whose result overflows come back as nan.
+        """
+        try:
+            code = self.compile(expression, trig_mode, (variable,))
+        except Exception as e:
+            raise ValueError(f"Evaluation error: {str(e)}")
+
+        numpy = load_numpy()
+        if numpy is not None:
+            namespace = dict(array_names())
+            namespace[variable] = values = numpy.asarray(values, dtype=float)
+            try:
+                with numpy.errstate(all='ignore'):
+                    result = eval(code, {'__builtins__': {}}, namespace)
+            except Exception as e:
+                raise ValueError(f"Evaluation error: {str(e)}")
+            # Expressions that ignore the variable still give one value per point
+            result = numpy.broadcast_to(result, values.shape).astype(float)
+            # inf from a finite point is a domain error or overflow, which the loop below makes nan
+            result[~numpy.isfinite(result) & numpy.isfinite(values)] = math.nan
+            return result
+
+        namespace = dict(self._allowed_names)
+        builtins = {'__builtins__': {}}
+        results = []
+        for value in values:
+            # Floats in and out, as in NumPy's pass: an int point can't build a
+            # huge integer, and the cost check on compiling covers the rest
+            namespace[variable] = value = float(value)
+            try:
+                result = eval(code, builtins, namespace)
+            except (ValueError, ArithmeticError):
+                result = math.nan
+            except Exception as e:
+                raise ValueError(f"Evaluation error: {str(e)}")
+            result = math.nan if type(result) is complex else float(result)
+            results.append(result if math.isfinite(result) or not math.isfinite(value) else math.nan)
+        return results
+
+
+# Shared engine for callers that don't need their own settings
+default_engine = Engine()
+
+
+def evaluate(expression, trig_mode="rad"):
+    """Evaluate an expression with the shared engine"""
+    return default_engine.evaluate(expression, trig_mode)
+
+
+def compile_expr(expression, vars=(), trig_mode="rad"):
+    """Compile an expression into a reusable callable, e.g. compile_expr("sin(x)*y", vars=("x", "y"))"""
+    return default_engine.compile_function(expression, vars, trig_mode)
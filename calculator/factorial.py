@@ -0,0 +1,151 @@
+"""Factorials for the n! key and the engine's factorial() function.
+
+Small factorials come from a memo table that grows as larger ones are asked
+for. Large ones use Luschny's prime-swing algorithm: n! = ((n//2)!)**2 *
+swing(n), where swing(n) is a product of prime powers multiplied together
+by binary splitting, so the big multiplications happen between numbers of
+similar size. Non-integers go through the gamma function, and log-gamma
+gives them a scientific-notation answer when gamma overflows a float.
+"""
+import bisect
+import math
+
+from formatting import format_number
+
+TABLE_LIMIT = 1000  # largest n kept in the memo table
+SWING_THRESHOLD = 20000  # below this math.factorial is faster than prime swing
+EXACT_DIGITS = 100000  # larger results are only estimated with log-gamma
+MAX_LOG10 = 1e13  # past this log-gamma leaves no digits of the mantissa
+
+LN10 = math.log(10)
+
+_table = [1]  # _table[n] == n!
+_primes = []  # primes up to _sieved, grown by doubling
+_sieved = 1
+
+
+def _primes_up_to(n):
+    """Return the list of primes <= n, extending the shared sieve if needed"""
+    global _primes, _sieved
+    if n > _sieved:
+        limit = max(n, 2 * _sieved)
+        sieve = bytearray([1]) * (limit + 1)
+        sieve[0] = sieve[1] = 0
+        for i in range(2, math.isqrt(limit) + 1):
+            if sieve[i]:
+                sieve[i * i::i] = bytes(len(range(i * i, limit + 1, i)))
+        _primes = [i for i in range(2, limit + 1) if sieve[i]]
+        _sieved = limit
+    return _primes[:bisect.bisect_right(_primes, n)]
+
+
+def _product(values, lo, hi):
+    """Multiply values[lo:hi] by binary splitting"""
+    if hi - lo <= 8:
+        result = 1
+        for i in range(lo, hi):
+            result *= values[i]
+        return result
+    mid = (lo + hi) // 2
+    return _product(values, lo, mid) * _product(values, mid, hi)
+
+
+def _swing(n, primes):
+    """n! // ((n // 2)!) ** 2 as a product of prime powers"""
+    root = math.isqrt(n)
+    factors = []
+    for p in primes:
+        if p > root:
+            break
+        # The exponent of p is the number of odd quotients n // p**k
+        q, exponent = n, 0
+        while q:
+            q //= p
+            exponent += q & 1
+        if exponent:
+            factors.append(p ** exponent)
+    for p in primes:
+        if p <= root:
+            continue
+        if p > n // 2:
+            break
+        # Above sqrt(n) the exponent is just the parity of n // p
+        if (n // p) & 1:
+            factors.append(p)
+    # Every prime in (n/2, n] divides the swing exactly once
+    factors.extend(primes[bisect.bisect_right(primes, n // 2):bisect.bisect_right(primes, n)])
+    return _product(factors, 0, len(factors))
+
+
+def _prime_swing(n, primes):
+    if n < SWING_THRESHOLD:
+        return _table[n] if n < len(_table) else math.factorial(n)
+    half = _prime_swing(n // 2, primes)
+    return half * half * _swing(n, primes)
+
+
+def factorial(n):
+    """n! for an int n >= 0; other numbers get gamma(n + 1) as a float"""
+    if type(n) is not int:
+        if n < 0 and float(n).is_integer():
+            raise ValueError("Factorial of negative number")
+        return math.gamma(n + 1)
+    if n < 0:
+        raise ValueError("Factorial of negative number")
+    if n < len(_table):
+        return _table[n]
+    if n <= TABLE_LIMIT:
+        value = _table[-1]
+        for i in range(len(_table), n + 1):
+            value *= i
+            _table.append(value)
+        return value
+    if n < SWING_THRESHOLD:
+        return math.factorial(n)
+    return _prime_swing(n, _primes_up_to(n))
+
+
+def log10_factorial(x):
+    """log10(x!) from log-gamma, for any x >= 0"""
+    return math.lgamma(x + 1) / LN10
+
+
+def factorial_digits(x):
+    """Number of decimal digits in the integer part of x!"""
+    return int(log10_factorial(x)) + 1
+
+
+def scientific_factorial(x, places=10):
+    """x! in scientific notation from log-gamma, e.g. '8.26393e+5565708'
+
+    log-gamma is good to about 13 significant digits, and the exponent uses up
+    some of them, so larger results get fewer mantissa digits.
+    """
+    log10 = log10_factorial(x)
+    if log10 >= MAX_LOG10:
+        raise ValueError("Number too large for factorial")
+    exponent = math.floor(log10)
+    places = max(1, min(places, 13 - len(str(exponent))))
+    mantissa = 10 ** (log10 - exponent)
+    if round(mantissa, places - 1) >= 10:
+        mantissa, exponent = mantissa / 10, exponent + 1
+    return f"{mantissa:.{places - 1}f}e+{exponent}"
+
+
+def factorial_text(x):
+    """Display text for x!, in scientific notation when it is long
+
+    Integer results past EXACT_DIGITS are never computed exactly; their
+    leading digits come from log-gamma instead.
+    """
+    if x < 0:
+        raise ValueError("Factorial of negative number")
+    if float(x).is_integer():
+        n = int(x)
+        if factorial_digits(n) <= EXACT_DIGITS:
+            return format_number(factorial(n))
+        return scientific_factorial(n)
+    try:
+        return str(math.gamma(x + 1))
+    except OverflowError:
+        return scientific_factorial(x)
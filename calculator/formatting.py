@@ -0,0 +1,150 @@
+"""Turn results, including very large integers, into display text.
+
+str() on an int is quadratic in its number of digits, and from Python 3.11
+it refuses ints past sys.get_int_max_str_digits() (4300 digits by default),
+so a valid answer such as 2**100000 used to show up as an error. Here large
+ints are converted by divide and conquer on top of decimal, whose big-number
+multiplication is much faster than the schoolbook algorithm. Most of the time
+only a short scientific form is wanted, and that needs just the leading
+digits, which one division by a power of ten gives without converting the
+whole number.
+"""
+import decimal
+import math
+from fractions import Fraction
+
+SHORT_DIGITS = 30  # integers up to this many digits are shown in full by default
+STR_BITS = 8192  # below this many bits (about 2466 digits) plain str() is fastest
+SPLIT_BITS = 1024  # pieces this small are converted with Decimal(int)
+
+LOG10_2 = math.log10(2)
+
+# Exact decimal arithmetic wide enough for any integer
+_context = decimal.Context(prec=decimal.MAX_PREC, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+_context.traps[decimal.Inexact] = True
+_approximate_context = decimal.Context(prec=60, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+
+
+def count_digits(n):
+    """Number of decimal digits in abs(n), without converting it"""
+    return leading_digits(n, 1)[1]
+
+
+def _to_decimal(n):
+    """Exact Decimal for a non-negative int by splitting it at powers of two"""
+    powers = {}
+
+    def power_of_two(bits):
+        # 2**bits as a Decimal, built from smaller cached powers
+        result = powers.get(bits)
+        if result is None:
+            if bits <= SPLIT_BITS:
+                result = decimal.Decimal(1 << bits)
+            else:
+                half = bits >> 1
+                result = _context.multiply(power_of_two(half), power_of_two(bits - half))
+            powers[bits] = result
+        return result
+
+    def convert(n, bits):
+        if bits <= SPLIT_BITS:
+            return decimal.Decimal(n)
+        low_bits = bits >> 1
+        high = n >> low_bits
+        low = n - (high << low_bits)
+        return _context.add(_context.multiply(convert(high, bits - low_bits), power_of_two(low_bits)),
+                            convert(low, low_bits))
+
+    return convert(n, n.bit_length())
+
+
+def int_to_str(n):
+    """Every digit of an int, fast for any size and never refused"""
+    if n.bit_length() < STR_BITS:
+        return str(n)
+    if n < 0:
+        return '-' + int_to_str(-n)
+    return format(_to_decimal(n), 'f')
+
+
+def _approximate(n):
+    """n > 0 to 60 significant digits, from its top 256 bits"""
+    shift = n.bit_length() - 256
+    return _approximate_context.multiply(decimal.Decimal(n >> shift),
+                                         _approximate_context.power(2, shift))
+
+
+def _decimal_approximation(n):
+    """n to at least 60 significant digits, without converting all of a huge n"""
+    if n.bit_length() <= 256:
+        return decimal.Decimal(n)
+    return _approximate(n) if n > 0 else -_approximate(-n)
+
+
+def leading_digits(n, count):
+    """The first count digits of abs(n) as an int, truncated, and its total digit count"""
+    n = abs(n)
+    if n.bit_length() < STR_BITS:
+        text = str(n)
+        return int(text[:count]), len(text)
+    # The approximation is good to about 58 digits, so unless the digits
+    # after the first count are all 0s or all 9s it truncates the same way n does
+    _, coefficient, exponent = _approximate(n).as_tuple()
+    digits = len(coefficient) + exponent
+    tail = coefficient[count:count + 40]
+    if tail.count(0) < len(tail) and tail.count(9) < len(tail):
+        return int(''.join(map(str, coefficient[:count]))), digits
+    digits = int((n.bit_length() - 1) * LOG10_2) + 1
+    digits += n >= 10 ** digits
+    return n // 10 ** (digits - count), digits
+
+
+def scientific(n, places=10):
+    """An int in scientific notation with places significant digits, e.g. '9.990020930e+30102'"""
+    if n == 0:
+        return '0'
+    lead, digits = leading_digits(n, places + 1)
+    lead *= 10 ** max(0, places + 1 - digits)
+    lead = (lead + 5) // 10  # round half up on the extra digit
+    exponent = digits - 1
+    if lead >= 10 ** places:
+        lead //= 10
+        exponent += 1
+    mantissa = str(lead)
+    mantissa = mantissa[0] + ('.' + mantissa[1:] if places > 1 else '')
+    return f"{'-' if n < 0 else ''}{mantissa}e+{exponent}"
+
+
+def is_shortened(value):
+    """True if format_number shows value with fewer digits than it has"""
+    if type(value) is int:
+        return count_digits(value) > SHORT_DIGITS
+    if type(value) is decimal.Decimal:
+        return len(value.as_tuple().digits) > SHORT_DIGITS
+    if type(value) is Fraction:
+        return count_digits(value.numerator) > SHORT_DIGITS or count_digits(value.denominator) > SHORT_DIGITS
+    return False
+
+
+def format_number(value, places=10, full=False):
+    """Display text for a result
+
+    Integers and Decimals longer than SHORT_DIGITS come out with places
+    significant digits unless full is set, in which case every digit is
+    produced. Fractions show as numerator/denominator, or as a decimal with
+    places significant digits when either part is that long. Other values
+    use str().
+    """
+    if type(value) is int:
+        if full or count_digits(value) <= SHORT_DIGITS:
+            return int_to_str(value)
+        return scientific(value, places)
+    if type(value) is decimal.Decimal and not full and is_shortened(value):
+        return format(value, f'.{places}g')
+    if type(value) is Fraction:
+        if full or not is_shortened(value):
+            return f"{int_to_str(value.numerator)}/{int_to_str(value.denominator)}"
+        quotient = _approximate_context.divide(_decimal_approximation(value.numerator),
+                                               _decimal_approximation(value.denominator))
+        return format(quotient, f'.{places}g')
+    return str(value)
@@ -0,0 +1,111 @@
+"""Incremental model of the text typed into the calculator's display.
+
+While keys are pressed the display only grows at its end, so instead of
+rescanning the whole text on every key, InputState keeps what the key
+handlers need to know: whether the number being typed already has a decimal
+point, how many parentheses are open and what kind of character came last.
+Each appended character updates them in O(1), and the state from before it
+is saved, so backspace is O(1) too. Edits anywhere else, such as wrapping
+the display in parentheses or replacing it with a result, go through
+reset(), which rebuilds the state from the new text. edits counts the
+resets and pops, so a view can tell whether the text has only grown since it
+last drew it.
+
+Nothing here imports tkinter, so the rules can be exercised without a GUI.
+"""
+
+# Kinds of the last character typed
+DIGIT = 'digit'
+POINT = 'point'
+OPERATOR = 'operator'
+OPEN = 'open'
+CLOSE = 'close'
+NAME = 'name'  # letters of a function, constant or Ans, including π
+OTHER = 'other'  # e.g. the ! of a factorial
+
+ERROR_TEXT = "Error"
+
+# Characters that end the number being typed
+SEPARATORS = frozenset('+-*/%^()')
+
+
+class InputState:
+    """The display text and the facts about its end that key handlers ask for"""
+
+    __slots__ = ('_chars', '_saved', 'depth', 'point', 'last', 'result', 'error', 'edits')
+
+    def __init__(self, text=''):
+        self.edits = 0  # resets and pops so far; appends don't count
+        self.reset(text)
+
+    def reset(self, text='', result=False):
+        """Start again from text; result marks it as a result the user hasn't edited"""
+        self._chars = []
+        self._saved = []  # (depth, point, last) from before each character
+        self.depth = 0  # open parentheses minus closed ones
+        self.point = False  # the number or name at the end already has a '.'
+        self.last = None  # kind of the last character; None when empty
+        self.edits += 1
+        self.append(text)
+        self.result = result
+        self.error = False  # set by the caller when text is ERROR_TEXT
+
+    def append(self, text):
+        """Add text at the end, updating the state one character at a time"""
+        for char in text:
+            self._saved.append((self.depth, self.point, self.last))
+            self._chars.append(char)
+            if char in SEPARATORS:
+                self.point = False
+                if char == '(':
+                    self.depth += 1
+                    self.last = OPEN
+                elif char == ')':
+                    self.depth -= 1
+                    self.last = CLOSE
+                else:
+                    self.last = OPERATOR
+            elif char == '.':
+                self.point = True
+                if self.last != NAME:  # math.pi's dot is part of the name
+                    self.last = POINT
+            elif char.isdigit():
+                if self.last != NAME:  # log10 is still a name
+                    self.last = DIGIT
+            elif char.isalpha() or char == '_':
+                self.last = NAME
+            elif not char.isspace():
+                self.last = OTHER
+        self.result = self.error = False
+
+    def pop(self):
+        """Remove the last character, as backspace does"""
+        if self._chars:
+            self._chars.pop()
+            self.depth, self.point, self.last = self._saved.pop()
+            self.edits += 1
+        self.result = self.error = False
+
+    @property
+    def text(self):
+        return ''.join(self._chars)
+
+    @property
+    def empty(self):
+        return not self._chars
+
+    @property
+    def last_char(self):
+        """The last character, or '' when empty"""
+        return self._chars[-1] if self._chars else ''
+
+    def since(self, length):
+        """The text appended after the first length characters"""
+        return ''.join(self._chars[length:])
+
+    def __len__(self):
+        return len(self._chars)
+
+    def point_allowed(self):
+        """True if a decimal point may be typed: there is text and its last number has none"""
+        return bool(self._chars) and not self.point
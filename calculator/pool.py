@@ -0,0 +1,295 @@
+"""Deadline-bounded evaluation in sandboxed worker processes.
+
+Each worker evaluates one expression at a time under an address-space limit
+(where the ``resource`` module exists). A dispatcher thread hands out jobs
+and kills and replaces any worker that runs past its job's deadline or
+dies, so one pathological expression such as 9**9**9 never stalls the
+caller. submit() returns a concurrent.futures.Future; failures of any kind
+are reported as ValueError, like the engine's own errors. cancel() drops a
+queued job, or kills the worker running it and starts a fresh one.
+
+Expressions are costed before they are queued (see cost.py): ones the
+estimator rejects fail at once, and ones on the float path are cheap enough
+to evaluate in the caller's thread without a round trip to a worker.
+Decimal evaluations (digits set, see precision.py) always go to a worker;
+exact ones (see rational.py) are costed by their own engine.
+"""
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing.connection import wait
+
+from cost import FLOAT_PATH
+from engine import Engine
+from precision import DecimalEngine
+from rational import RationalEngine
+
+try:
+    import resource
+except ImportError:  # not available on Windows; workers run without a memory cap
+    resource = None
+
+DEFAULT_DEADLINE = 5.0  # seconds
+DEFAULT_MEMORY_LIMIT = 1024 * 1024 * 1024  # bytes of address space per worker
+
+
+def _limit_memory(limit):
+    if resource is None or not limit:
+        return
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError):
+        pass  # a hard limit below ours is already stricter
+
+
+def make_engine(digits=None, exact=False):
+    """An engine for the arithmetic asked for: Decimal to digits, exact rationals, or floats"""
+    if digits is not None:
+        return DecimalEngine(digits)
+    if exact:
+        return RationalEngine()
+    return Engine()
+
+
+def _worker_main(conn, memory_limit):
+    """Worker process loop: receive (expression, trig_mode, places, variables, digits, exact), send (ok, value)"""
+    _limit_memory(memory_limit)
+    engines = {}  # (digits, exact) -> engine
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        expression, trig_mode, places, variables, digits, exact = job
+        engine = engines.get((digits, exact))
+        if engine is None:
+            engine = engines[(digits, exact)] = make_engine(digits, exact)
+        try:
+            reply = (True, engine.evaluate(expression, trig_mode, places, variables))
+        except MemoryError:
+            reply = (False, "Evaluation error: out of memory")
+        except ValueError as e:
+            reply = (False, str(e))
+        except Exception as e:
+            reply = (False, f"Evaluation error: {e}")
+        try:
+            conn.send(reply)
+        except MemoryError:
+            conn.send((False, "Evaluation error: out of memory"))
+
+
+class _Worker:
+    """One worker process and the job it is running"""
+
+    def __init__(self, context, memory_limit):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child, memory_limit), daemon=True)
+        self.process.start()
+        child.close()
+        self.future = None
+        self.deadline = None  # monotonic time the current job must finish by
+        self.seconds = None
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class EvaluationPool:
+    """Evaluate expressions in worker processes with a per-job deadline"""
+
+    def __init__(self, workers=1, deadline=DEFAULT_DEADLINE, memory_limit=DEFAULT_MEMORY_LIMIT):
+        self.deadline = deadline
+        self.memory_limit = memory_limit
+        # spawn keeps workers independent of the caller's threads and Tk state
+        self._context = multiprocessing.get_context('spawn')
+        self._jobs = deque()
+        self._cancelled = []  # running futures whose workers the dispatcher should kill
+        self._lock = threading.Lock()
+        self._closed = False
+        self._engine = Engine()  # costs expressions and runs the float path
+        self._exact_engine = RationalEngine()
+        self._wake_reader, self._wake_writer = self._context.Pipe(duplex=False)
+        self._workers = [_Worker(self._context, memory_limit) for _ in range(workers)]
+        self._thread = threading.Thread(target=self._run, name='evaluation-pool', daemon=True)
+        self._thread.start()
+
+    def submit(self, expression, trig_mode='rad', places=10, deadline=None, variables=None, digits=None,
+               exact=False):
+        """Queue an expression and return a Future for its formatted result
+
+        variables maps extra names to values; their sizes aren't known up
+        front, so such expressions always run in a worker. digits selects
+        Decimal arithmetic to that many significant digits, and exact selects
+        exact rational arithmetic.
+        """
+        future = Future()
+        engine = self._exact_engine if exact else self._engine
+        if digits is not None:
+            inline = False
+        else:
+            try:
+                inline = not variables and engine.estimate(expression, trig_mode).path == FLOAT_PATH
+            except Exception:
+                inline = True  # evaluate() reports the error in its usual form
+        if inline:
+            try:
+                future.set_result(engine.evaluate(expression, trig_mode, places))
+            except ValueError as e:
+                future.set_exception(e)
+            return future
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Evaluation pool is closed")
+            job = (expression, trig_mode, places, variables, digits, exact)
+            self._jobs.append((future, job, deadline or self.deadline))
+            self._wake()
+        return future
+
+    def evaluate(self, expression, trig_mode='rad', places=10, deadline=None, variables=None, digits=None,
+                 exact=False):
+        """Evaluate an expression and wait for the result"""
+        return self.submit(expression, trig_mode, places, deadline, variables, digits, exact).result()
+
+    def cancel(self, future):
+        """Stop a submitted evaluation; a running one fails with 'Evaluation cancelled'"""
+        if future.cancel():
+            return  # still queued; the dispatcher skips it
+        with self._lock:
+            if self._closed or future.done():
+                return
+            self._cancelled.append(future)
+            self._wake()
+
+    def close(self):
+        """Stop the workers; queued jobs are cancelled"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._wake()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _wake(self):
+        # Called with self._lock held
+        self._wake_writer.send_bytes(b'')
+
+    def _run(self):
+        error = None
+        try:
+            while True:
+                with self._lock:
+                    if self._closed:
+                        break
+                self._kill_cancelled()
+                self._dispatch()
+                self._wait()
+        except Exception as e:
+            # Fail every waiting future rather than leave it hanging forever
+            error = ValueError(f"Evaluation pool failed: {e}")
+            with self._lock:
+                self._closed = True
+        finally:
+            self._shutdown(error)
+
+    def _kill_cancelled(self):
+        with self._lock:
+            cancelled, self._cancelled = self._cancelled, []
+        for future in cancelled:
+            for index, worker in enumerate(self._workers):
+                # A job that finished meanwhile has already left its worker
+                if worker.future is future:
+                    self._replace(index)
+                    future.set_exception(ValueError("Evaluation cancelled"))
+
+    def _dispatch(self):
+        for index in range(len(self._workers)):
+            while self._workers[index].future is None:
+                with self._lock:
+                    if not self._jobs:
+                        return
+                    future, job, seconds = self._jobs.popleft()
+                if not future.set_running_or_notify_cancel():
+                    continue
+                # The future is running now, so it can't go back on the queue
+                if not self._send(index, job):
+                    future.set_exception(ValueError("Evaluation error: could not start a worker"))
+                    continue
+                worker = self._workers[index]
+                worker.future = future
+                worker.seconds = seconds
+                worker.deadline = time.monotonic() + seconds
+
+    def _send(self, index, job):
+        """Send a job to a worker, replacing it once if it has died; False if the new one fails too"""
+        for _ in range(2):
+            try:
+                self._workers[index].conn.send(job)
+                return True
+            except (OSError, ValueError):
+                self._replace(index)
+        return False
+
+    def _wait(self):
+        busy = [worker for worker in self._workers if worker.future is not None]
+        timeout = None
+        if busy:
+            timeout = max(0, min(worker.deadline for worker in busy) - time.monotonic())
+        ready = wait([self._wake_reader] + [worker.conn for worker in busy], timeout)
+
+        if self._wake_reader in ready:
+            while self._wake_reader.poll():
+                self._wake_reader.recv_bytes()
+
+        now = time.monotonic()
+        for index, worker in enumerate(self._workers):
+            future = worker.future
+            if future is None:
+                continue
+            if worker.conn in ready:
+                try:
+                    ok, value = worker.conn.recv()
+                except (EOFError, OSError):
+                    self._replace(index)
+                    future.set_exception(ValueError("Evaluation error: worker crashed (out of memory?)"))
+                    continue
+                worker.future = None
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(ValueError(value))
+            elif now >= worker.deadline:
+                seconds = worker.seconds
+                self._replace(index)
+                future.set_exception(ValueError(f"Evaluation timed out after {seconds:g} s"))
+
+    def _replace(self, index):
+        """Kill a worker and start a fresh one in its place"""
+        self._workers[index].kill()
+        self._workers[index] = _Worker(self._context, self.memory_limit)
+        return self._workers[index]
+
+    def _shutdown(self, error=None):
+        """Stop the workers; queued jobs are cancelled, or fail with error if the dispatcher crashed"""
+        for worker in self._workers:
+            if worker.future is not None and not worker.future.done():
+                worker.future.set_exception(error or ValueError("Evaluation pool closed"))
+            worker.kill()
+        with self._lock:
+            jobs, self._jobs = self._jobs, deque()
+        for future, _, _ in jobs:
+            if error is None:
+                future.cancel()
+            elif future.set_running_or_notify_cancel():
+                future.set_exception(error)
@@ -0,0 +1,346 @@
+"""Arbitrary-precision evaluation backed by decimal.
+
+DecimalEngine runs the same tokenizer, parser and whitelist as Engine, but
+number literals become exact Decimals built from their source text, so 0.1
+is exactly one tenth, and the keypad's functions are replaced by Decimal
+versions that work to the engine's precision. ln, log10, exp and sqrt use
+decimal's own correctly rounded methods; the trig functions and nth roots
+are computed here with guard digits and rounded once at the end. pi and e
+come from constants.py, which keeps them on disk.
+"""
+import ast
+import decimal
+import functools
+from decimal import Decimal
+from fractions import Fraction
+
+from constants import e, pi
+from cost import BIG_INTEGER_PATH, Cost, estimate_cost
+from engine import Engine, _Rewriter, literal_text
+from factorial import factorial as int_factorial
+
+DEFAULT_PRECISION = 50  # significant digits
+GUARD_DIGITS = 10  # extra digits carried inside a function before rounding
+
+
+def to_decimal(x):
+    """Decimal for an int, float or Decimal, exactly; a Fraction is rounded to the current precision"""
+    if type(x) is Decimal:
+        return x
+    if type(x) is Fraction:
+        return Decimal(x.numerator) / x.denominator
+    return Decimal(x)
+
+
+def _guarded(func):
+    """Run func on Decimal arguments with guard digits, then round to the caller's precision"""
+    @functools.wraps(func)
+    def wrapper(*args):
+        with decimal.localcontext() as context:
+            context.prec += GUARD_DIGITS
+            result = func(*map(to_decimal, args))
+        return +result
+    return wrapper
+
+
+def _taylor_sin_cos(y):
+    """(sin y, cos y) by Taylor series; y should be small, |y| <= pi/4 or so"""
+    y2 = y * y
+    sin = term = y
+    n = 1
+    while True:
+        term = -term * y2 / ((n + 1) * (n + 2))
+        n += 2
+        total = sin + term
+        if total == sin:
+            break
+        sin = total
+    cos = term = Decimal(1)
+    n = 0
+    while True:
+        term = -term * y2 / ((n + 1) * (n + 2))
+        n += 2
+        total = cos + term
+        if total == cos:
+            break
+        cos = total
+    return sin, cos
+
+
+def _sin_cos(x):
+    """(sin x, cos x) to the current precision"""
+    context = decimal.getcontext()
+    precision = context.prec
+    # Reducing a large x by multiples of pi/2 needs digits for its integer part too
+    context.prec = precision + max(0, x.adjusted())
+    half_pi = pi(context.prec) / 2
+    quadrant = (x / half_pi).to_integral_value()
+    y = x - quadrant * half_pi
+    quadrant = int(quadrant) % 4  # at the restored precision quadrant % 4 can't be worked out
+    context.prec = precision
+    sin, cos = _taylor_sin_cos(+y)
+    return [(sin, cos), (cos, -sin), (-sin, -cos), (-cos, sin)][quadrant]
+
+
+@_guarded
+def sin(x):
+    return _sin_cos(x)[0]
+
+
+@_guarded
+def cos(x):
+    return _sin_cos(x)[1]
+
+
+@_guarded
+def tan(x):
+    sin, cos = _sin_cos(x)
+    return sin / cos
+
+
+@_guarded
+def radians(x):
+    return x * pi(decimal.getcontext().prec) / 180
+
+
+def _reduce_degrees(x):
+    """x reduced to 0 <= x < 360, and its quadrant when it is an exact multiple of 90"""
+    with decimal.localcontext() as context:
+        # Exact, however large x is: the remainder needs digits for the integer part
+        context.prec += max(0, x.adjusted())
+        x = mod(x, 360)
+        quadrant, rest = divmod(x, 90)
+    return x, None if rest else int(quadrant)
+
+
+@_guarded
+def sin_deg(x):
+    x, quadrant = _reduce_degrees(x)
+    if quadrant is not None:
+        return Decimal((0, 1, 0, -1)[quadrant])
+    return _sin_cos(radians(x))[0]
+
+
+@_guarded
+def cos_deg(x):
+    x, quadrant = _reduce_degrees(x)
+    if quadrant is not None:
+        return Decimal((1, 0, -1, 0)[quadrant])
+    return _sin_cos(radians(x))[1]
+
+
+@_guarded
+def tan_deg(x):
+    x, quadrant = _reduce_degrees(x)
+    if quadrant is not None:
+        if quadrant % 2:
+            raise ValueError("tan is undefined at odd multiples of 90 degrees")
+        return Decimal(0)
+    sin, cos = _sin_cos(radians(x))
+    return sin / cos
+
+
+def log(x, base=None):
+    """Natural logarithm, or logarithm to base"""
+    if base is None:
+        return to_decimal(x).ln()
+    return _log_base(x, base)
+
+
+@_guarded
+def _log_base(x, base):
+    return x.ln() / base.ln()
+
+
+def log10(x):
+    return to_decimal(x).log10()
+
+
+def exp(x):
+    return to_decimal(x).exp()
+
+
+def sqrt(x):
+    return to_decimal(x).sqrt()
+
+
+@_guarded
+def root(x, n):
+    """The nth root of x; odd roots of negative numbers are negative"""
+    if x < 0 and n == n.to_integral_value() and n % 2 == 1:
+        return -((-x).ln() / n).exp()
+    if x == 0:
+        return x
+    return (x.ln() / n).exp()
+
+
+def mod(x, m):
+    """x % m with the sign of m, as % is for Python's ints and floats; Decimal's own % truncates"""
+    x, m = to_decimal(x), to_decimal(m)
+    if not m:
+        raise decimal.DivisionByZero("modulo by zero")
+    remainder = x % m
+    if remainder and (remainder < 0) != (m < 0):
+        remainder += m
+    return remainder
+
+
+def power(base, exponent):
+    """base ** exponent, with 0 ** 0 == 1 as in the other modes; Decimal's own ** rejects it"""
+    base, exponent = to_decimal(base), to_decimal(exponent)
+    if not base and not exponent:
+        return Decimal(1)
+    return base ** exponent
+
+
+def factorial(x):
+    """x! for a whole number x, worked out exactly and then rounded to the precision"""
+    x = to_decimal(x)
+    if x != x.to_integral_value():
+        raise ValueError("Decimal mode only has factorials of whole numbers")
+    if x < 0:
+        raise ValueError("Factorial of negative number")
+    return Decimal(int_factorial(int(x)))
+
+
+def powmod(base, exponent, modulus):
+    """base ** exponent % modulus, exactly when all three are integers and the exponent isn't negative"""
+    base, exponent, modulus = args = list(map(to_decimal, (base, exponent, modulus)))
+    # Integers past the precision aren't exact any more, and int() of one could be huge
+    precision = decimal.getcontext().prec
+    if (exponent >= 0 and modulus
+            and all(arg == arg.to_integral_value() and arg.adjusted() < precision for arg in args)):
+        return Decimal(pow(*map(int, args)))
+    return mod(base ** exponent, modulus)
+
+
+DECIMAL_NAMES = {
+    'sin': sin,
+    'cos': cos,
+    'tan': tan,
+    'log': log,
+    'log10': log10,
+    'sqrt': sqrt,
+    'exp': exp,
+    'abs': abs,
+    'radians': radians,
+    'sin_deg': sin_deg,
+    'cos_deg': cos_deg,
+    'tan_deg': tan_deg,
+    'root': root,
+    'powmod': powmod,
+    'mod': mod,
+    'pow': power,
+    'factorial': factorial,
+    'Decimal': Decimal,
+    # pi and e are added per precision by DecimalEngine
+    'pi': None,
+    'e': None
+}
+
+
+class _DecimalRewriter(_Rewriter):
+    """The engine's rewrites, plus exact Decimal literals, x ** (1/n) as root(x, n), ** as pow() and % as mod()"""
+
+    def __init__(self, allowed_names, trig_mode, source):
+        super().__init__(allowed_names, trig_mode)
+        self.source = source.encode()
+
+    def visit_Constant(self, node):
+        node = super().visit_Constant(node)
+        # The source text keeps every digit the user typed; the float value may not
+        text = literal_text(self.source, node)
+        return self._call('Decimal', [ast.copy_location(ast.Constant(value=text), node)], node)
+
+    def visit_BinOp(self, node):
+        exponent = node.right
+        if (isinstance(node.op, ast.Pow) and isinstance(exponent, ast.BinOp)
+                and isinstance(exponent.op, ast.Div) and isinstance(exponent.left, ast.Constant)
+                and exponent.left.value == 1):
+            return self._call('root', [self.visit(node.left), self.visit(exponent.right)], node)
+        node = super().visit_BinOp(node)
+        if not isinstance(node, ast.BinOp):
+            return node
+        if isinstance(node.op, ast.Pow):
+            return self._call('pow', [node.left, node.right], node)
+        if isinstance(node.op, ast.Mod):
+            left = node.left
+            if isinstance(left, ast.Call) and left.func.id == 'pow':
+                # a ** b % m; the power was rewritten before the engine could spot it
+                return self._call('powmod', [*left.args, node.right], node)
+            return self._call('mod', [node.left, node.right], node)
+        return node
+
+
+_DecimalRewriter._dispatch = {
+    **_Rewriter._dispatch,
+    ast.Constant: _DecimalRewriter.visit_Constant,
+    ast.BinOp: _DecimalRewriter.visit_BinOp
+}
+
+
+class DecimalEngine(Engine):
+    """Evaluate calculator expressions in Decimal arithmetic to a chosen precision"""
+
+    def __init__(self, precision=DEFAULT_PRECISION, trig_mode="rad", cache_size=256):
+        super().__init__(trig_mode, DECIMAL_NAMES, cache_size)
+        self.precision = precision
+
+    @property
+    def precision(self):
+        return self._context.prec
+
+    @precision.setter
+    def precision(self, digits):
+        # Compiled code doesn't depend on the precision, only the constants do
+        self._context = decimal.Context(prec=digits, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN)
+        self._namespace = {**self._allowed_names, 'pi': pi(digits), 'e': e(digits)}
+
+    def _rewrite(self, tree, source, names, trig_mode):
+        return _DecimalRewriter(names, trig_mode, source).visit(tree)
+
+    def _compile(self, expression, trig_mode, variables):
+        # The estimate rejects integers too large to build, as in the other
+        # modes; anything it lets through is still heavy work at high precision
+        tree = self._parse(expression, trig_mode, variables)
+        cost = estimate_cost(tree, self._max_digits)
+        return compile(tree, '<expression>', 'eval'), Cost(BIG_INTEGER_PATH, cost.digits, cost.work), None
+
+    def safe_eval(self, expression, trig_mode=None, variables=None):
+        """Evaluate an expression to a Decimal rounded to the engine's precision"""
+        try:
+            code = self.compile(expression, trig_mode, tuple(variables or ()))
+            with decimal.localcontext(self._context):
+                if variables:
+                    namespace = {**self._namespace, **{name: to_decimal(value) for name, value in variables.items()}}
+                else:
+                    namespace = self._namespace
+                result = +to_decimal(eval(code, {'__builtins__': {}}, namespace))
+        except decimal.DivisionByZero:
+            raise ValueError("Evaluation error: division by zero")
+        except decimal.Overflow:
+            raise ValueError("Evaluation error: result too large")
+        except decimal.InvalidOperation:
+            raise ValueError("Evaluation error: math domain error")
+        except MemoryError:
+            raise ValueError("Evaluation error: out of memory")
+        except Exception as e:
+            raise ValueError(f"Evaluation error: {str(e)}")
+        if not result.is_finite():
+            # e.g. log(0) or 0**-1, which the float engine rejects as well
+            raise ValueError("Evaluation error: math domain error")
+        return result
+
+    def evaluate(self, expression, trig_mode=None, places=10, variables=None):
+        """Evaluate an expression and drop trailing zeros from the result
+
+        places is accepted for compatibility with Engine.evaluate; the
+        precision decides how many digits a Decimal result has.
+        """
+        if not expression:
+            raise ValueError("Empty expression")
+        result = self.safe_eval(expression, trig_mode, variables)
+        with decimal.localcontext(self._context):
+            if result == result.to_integral_value() and result.adjusted() < self.precision:
+                return result.quantize(Decimal(1))
+            return result.normalize()
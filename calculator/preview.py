@@ -0,0 +1,91 @@
+"""Live preview of the result while an expression is being typed.
+
+Previewer evaluates on a background thread, so a key press never waits for
+it. Only the latest request matters: when the next arrives, one that hasn't
+started is dropped, and the caller ignores results it has moved past. One
+already running in the worker is left to finish under its deadline rather
+than cancelled, since cancelling kills the worker and starting another costs
+more than most previews take. The text goes through the same
+pipeline as the '=' button: prepare() closes any open parentheses, then an
+EvaluationPool costs the expression, evaluates cheap ones in the preview
+thread and sends the rest to a worker process of its own, with a short
+deadline, so a preview never queues in front of '='.
+"""
+import threading
+from concurrent.futures import Future
+
+from engine import Engine
+from pool import EvaluationPool
+
+PREVIEW_DEADLINE = 1.0  # seconds a preview may take in a worker
+
+
+class Previewer:
+    """Evaluate the latest display text on a background thread"""
+
+    def __init__(self, deadline=PREVIEW_DEADLINE):
+        self._engine = Engine()  # prepares display text
+        self._pool = EvaluationPool(deadline=deadline)
+        self._condition = threading.Condition()
+        self._request = None  # (future, job) waiting for the thread
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='preview', daemon=True)
+        self._thread.start()
+
+    def submit(self, text, trig_mode='rad', variables=None, digits=None, exact=False):
+        """Queue display text and return a Future for its result, cancelling an older request not yet started"""
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Previewer is closed")
+            if self._request is not None:
+                self._request[0].cancel()
+            self._request = (future, (text, trig_mode, variables, digits, exact))
+            self._condition.notify()
+        return future
+
+    def close(self):
+        """Stop the thread and the worker; a request not yet started is cancelled"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            if self._request is not None:
+                self._request[0].cancel()
+                self._request = None
+            self._condition.notify()
+        # Closing the pool fails a preview still in the worker, which frees the thread
+        self._pool.close()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._request is None and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+                (future, job), self._request = self._request, None
+            if not future.set_running_or_notify_cancel():
+                continue
+            text, trig_mode, variables, digits, exact = job
+            try:
+                expression = self._engine.prepare(text)
+                if self._superseded():
+                    raise ValueError("Superseded")  # no point starting it
+                # Submitted without the lock: a cheap expression is evaluated
+                # right here, and submit() on the Tk thread mustn't wait for it
+                running = self._pool.submit(expression, trig_mode, variables=variables,
+                                            digits=digits, exact=exact)
+                if self._superseded() and running.cancel():
+                    raise ValueError("Superseded")  # still queued for the worker
+                value = running.result()
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(value)
+
+    def _superseded(self):
+        """True if a newer request is waiting"""
+        with self._condition:
+            return self._request is not None
@@ -0,0 +1,116 @@
+"""Exact rational evaluation backed by fractions.Fraction.
+
+RationalEngine runs the same pipeline as Engine, but division and powers
+stay exact: 1/3 is Fraction(1, 3) rather than 0.333..., and decimal literals
+such as 0.1 become the fraction their digits spell. Expressions without a
+division or a decimal point never create a Fraction at all and run on plain
+ints, the fast path. Whole fractions are turned back into ints as soon as
+they appear. The transcendental functions (sin, log, sqrt, ...) convert
+their argument to float, so anything that goes through one of them, and
+anything combined with its result, is a float as in the ordinary engine.
+"""
+import ast
+from decimal import Decimal
+from fractions import Fraction
+
+from engine import ALLOWED_NAMES, Engine, _Rewriter, literal_text
+from factorial import factorial
+
+
+def exact(x):
+    """An int for a whole Fraction, so integer work stays on the int fast path"""
+    if type(x) is Fraction and x.denominator == 1:
+        return x.numerator
+    return x
+
+
+def divide(a, b):
+    """a / b, exact unless either side is a float"""
+    if type(a) is float or type(b) is float:
+        return a / b
+    if not b:
+        raise ZeroDivisionError("division by zero")
+    if type(a) is int and type(b) is int:
+        quotient, remainder = divmod(a, b)
+        return Fraction(a, b) if remainder else quotient
+    return exact(Fraction(a) / b)
+
+
+def power(base, exponent):
+    """base ** exponent, exact for a whole exponent and a rational base"""
+    exponent = exact(exponent)
+    if type(exponent) is int and type(base) is not float:
+        if exponent >= 0:
+            return base ** exponent
+        if not base:
+            raise ZeroDivisionError("0 cannot be raised to a negative power")
+        return exact(Fraction(base) ** exponent)
+    return base ** exponent
+
+
+RATIONAL_NAMES = {
+    **ALLOWED_NAMES,
+    'factorial': lambda x: factorial(exact(x)),
+    'divide': divide,
+    'power': power,
+    'Fraction': Fraction
+}
+
+
+class _RationalRewriter(_Rewriter):
+    """The engine's rewrites, plus exact literals, division and powers"""
+
+    def __init__(self, allowed_names, trig_mode, source):
+        super().__init__(allowed_names, trig_mode)
+        self.source = source.encode()
+
+    def visit_Constant(self, node):
+        node = super().visit_Constant(node)
+        if type(node.value) is not float:
+            return node
+        # Build the fraction from the digits typed, not from the float they round to
+        value = Fraction(literal_text(self.source, node))
+        if value.denominator == 1:
+            return ast.copy_location(ast.Constant(value=value.numerator), node)
+        args = [ast.copy_location(ast.Constant(value=part), node) for part in value.as_integer_ratio()]
+        return self._call('Fraction', args, node)
+
+    def visit_BinOp(self, node):
+        node = super().visit_BinOp(node)
+        if not isinstance(node, ast.BinOp):
+            return node  # already rewritten, e.g. to powmod
+        if isinstance(node.op, ast.Div):
+            return self._call('divide', [node.left, node.right], node)
+        # int ** int literal can't leave the integers; anything else might
+        if isinstance(node.op, ast.Pow) and not (isinstance(node.right, ast.Constant)
+                                                 and type(node.right.value) is int):
+            return self._call('power', [node.left, node.right], node)
+        return node
+
+
+_RationalRewriter._dispatch = {
+    **_Rewriter._dispatch,
+    ast.Constant: _RationalRewriter.visit_Constant,
+    ast.BinOp: _RationalRewriter.visit_BinOp
+}
+
+
+def _to_fraction(value):
+    # Decimal results, e.g. an Ans from decimal mode, convert exactly
+    return Fraction(value) if type(value) is Decimal else value
+
+
+class RationalEngine(Engine):
+    """Evaluate calculator expressions exactly in ints and Fractions"""
+
+    def __init__(self, trig_mode="rad", cache_size=256, **kwargs):
+        super().__init__(trig_mode, RATIONAL_NAMES, cache_size, **kwargs)
+
+    def _rewrite(self, tree, source, names, trig_mode):
+        return _RationalRewriter(names, trig_mode, source).visit(tree)
+
+    def safe_eval(self, expression, trig_mode=None, variables=None):
+        """Evaluate an expression to an int, a Fraction or, past a transcendental function, a float"""
+        if variables:
+            variables = {name: _to_fraction(value) for name, value in variables.items()}
+        return exact(super().safe_eval(expression, trig_mode, variables))
@@ -0,0 +1,174 @@
+"""Asyncio evaluation server speaking newline-delimited JSON.
+
+Several tools can share warm engines instead of each paying for
+interpreter start-up. Every request and response is one JSON object on one
+line:
+
+    {"id": 1, "expression": "sin(30)", "mode": "deg", "precision": 10}
+    {"id": 1, "result": 0.5}
+    {"id": 2, "error": "Evaluation error: division by zero"}
+
+Clients may pipeline requests; responses carry the request id and can come
+back out of order. Expressions run in an EvaluationPool, so one that runs past
+its deadline or memory limit is killed instead of stalling the server. Run
+``python server.py --help`` for the options and see client.py for a client
+and load generator.
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from batch import json_value
+from pool import DEFAULT_DEADLINE, DEFAULT_MEMORY_LIMIT, EvaluationPool
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_LINE = 1 << 20  # longest request line accepted, in bytes
+MAX_PRECISION = 15
+
+
+def load_request(line):
+    """Decode a request line into a dict, raising ValueError if it isn't a JSON object"""
+    try:
+        request = json.loads(line)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Request is not valid JSON")
+    if not isinstance(request, dict):
+        raise ValueError("Request must be a JSON object")
+    return request
+
+
+def request_fields(request):
+    """Return (expression, mode, precision) from a request, raising ValueError if one is invalid"""
+    expression = request.get('expression')
+    mode = request.get('mode', 'rad')
+    precision = request.get('precision', 10)
+    if not isinstance(expression, str):
+        raise ValueError("'expression' must be a string")
+    if mode not in ('rad', 'deg'):
+        raise ValueError("'mode' must be 'rad' or 'deg'")
+    if type(precision) is not int or not 0 <= precision <= MAX_PRECISION:
+        raise ValueError(f"'precision' must be an integer from 0 to {MAX_PRECISION}")
+    return expression, mode, precision
+
+
+class EvaluationServer:
+    """Serves engine evaluations to any number of connections"""
+
+    def __init__(self, max_concurrency=64, workers=2, deadline=DEFAULT_DEADLINE,
+                 memory_limit=DEFAULT_MEMORY_LIMIT, max_line=MAX_LINE):
+        self.pool = EvaluationPool(workers, deadline, memory_limit)
+        self.max_line = max_line
+        # Requests being evaluated across all connections; readers wait when it is reached
+        self._limit = asyncio.Semaphore(max_concurrency)
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None):
+        """Start listening on a Unix socket if path is given, otherwise on TCP"""
+        if path:
+            return await asyncio.start_unix_server(self.handle_connection, path, limit=self.max_line)
+        return await asyncio.start_server(self.handle_connection, host, port, limit=self.max_line)
+
+    def close(self):
+        self.pool.close()
+
+    async def handle_connection(self, reader, writer):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                await self._limit.acquire()
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # Line longer than max_line; the stream can't be resynchronised
+                    self._limit.release()
+                    await self._send(writer, write_lock, {'id': None, 'error': "Request line too long"})
+                    break
+                except ConnectionError:
+                    self._limit.release()
+                    break
+                if not line:
+                    self._limit.release()
+                    break
+                if not line.strip():
+                    self._limit.release()
+                    continue
+                task = asyncio.create_task(self._serve(line, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def _serve(self, line, writer, write_lock):
+        try:
+            response = await self.respond(line)
+        finally:
+            self._limit.release()
+        await self._send(writer, write_lock, response)
+
+    async def respond(self, line):
+        """Evaluate one request line and return the response object"""
+        request_id = None
+        try:
+            request = load_request(line)
+            request_id = request.get('id')
+            expression, mode, precision = request_fields(request)
+            result = await asyncio.wrap_future(self.pool.submit(expression, mode, precision))
+            return {'id': request_id, 'result': json_value(result)}
+        except ValueError as e:
+            return {'id': request_id, 'error': str(e)}
+        except Exception as e:
+            return {'id': request_id, 'error': f"Evaluation error: {e}"}
+
+    async def _send(self, writer, write_lock, response):
+        async with write_lock:
+            try:
+                writer.write(json.dumps(response, ensure_ascii=False).encode() + b'\n')
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+
+async def serve(args):
+    server = EvaluationServer(args.max_concurrency, args.workers, args.deadline,
+                              args.memory_limit * 1024 * 1024)
+    listener = await server.start(args.host, args.port, args.unix)
+    where = args.unix or f"{args.host}:{args.port}"
+    print(f"Calculator server listening on {where}", flush=True)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        server.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve calculator evaluations over newline-delimited JSON.")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"TCP address (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"TCP port (default: {DEFAULT_PORT})")
+    parser.add_argument('--unix', metavar='PATH', help="listen on a Unix socket instead of TCP")
+    parser.add_argument('--max-concurrency', type=int, default=64, metavar='N',
+                        help="requests evaluated or queued at once across all connections (default: 64)")
+    parser.add_argument('--workers', type=int, default=2, metavar='N',
+                        help="evaluation worker processes (default: 2)")
+    parser.add_argument('--deadline', type=float, default=DEFAULT_DEADLINE, metavar='SECONDS',
+                        help=f"time allowed per expression (default: {DEFAULT_DEADLINE:g})")
+    parser.add_argument('--memory-limit', type=int, default=DEFAULT_MEMORY_LIMIT // (1024 * 1024),
+                        metavar='MB', help="address space per worker, where supported (default: %(default)s)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+"""Everything the calculator knows, kept apart from its widgets.
+
+CalculatorState holds the expression being typed, the last result, memory,
+history and the arithmetic modes, and the key handlers change it rather
+than reading and writing the display. The window renders the display,
+history list and mode label from it after each change, so a key press
+costs at most one Tcl call for the display instead of several get() and
+insert() round trips, and the logic can be run and timed without Tk.
+"""
+from decimal import Decimal
+
+from display import ANS, HistoryEntry, Result
+from input_state import ERROR_TEXT, InputState
+from precision import to_decimal
+
+HISTORY_SHOWN = 5  # entries in the history list
+
+
+class CalculatorState:
+    """The expression buffer, last result, memory, history and modes"""
+
+    def __init__(self):
+        self.input = InputState()  # the expression being typed, as the display shows it
+        self.result = None  # Result behind the last result shown, with the exact value
+        self.memory = 0
+        self.history = []
+        self.trig_mode = "rad"  # 'rad' or 'deg'
+        self.digits = None  # significant digits of decimal mode; None for floats
+        self.exact = False  # exact fraction mode
+
+    @property
+    def text(self):
+        return self.input.text
+
+    # Editing the expression
+
+    def append(self, text):
+        self.input.append(text)
+
+    def set_text(self, text, result=False):
+        """Replace the expression; result marks text as a result just shown"""
+        self.input.reset(text, result)
+
+    def set_error(self):
+        """Show the error marker; the next key clears it"""
+        self.input.reset(ERROR_TEXT)
+        self.input.error = True
+
+    def clear(self):
+        self.input.reset()
+        self.result = None
+
+    def clear_error(self):
+        if self.input.error:
+            self.clear()
+
+    def showing_result(self):
+        """True if the display still shows the last result unchanged"""
+        return self.result is not None and self.input.result
+
+    def continue_from_result(self):
+        """Put Ans in place of a shortened result, which can't be calculated with
+
+        Called before the keys that use the display as a number: operators,
+        =, +/-, log, ln, n! and 1/x, so they work on the exact value rather
+        than its digits.
+        """
+        if self.showing_result() and self.result.truncated:
+            self.input.reset(ANS)
+
+    def type_digit(self, char):
+        """A digit or decimal point"""
+        self.clear_error()
+
+        # If last result is displayed and user starts typing a number, clear first
+        if self.input.result:
+            self.input.reset()
+
+        # A decimal point is only allowed once per number
+        if char != '.' or self.input.point_allowed():
+            self.input.append(char)
+
+    def type_operator(self, operator):
+        """+ - * / ( or )"""
+        self.clear_error()
+
+        # Handle implicit multiplication for parentheses
+        if operator == '(' and not self.input.empty:
+            last_char = self.input.last_char
+            if last_char.isdigit() or last_char in ')!π':
+                # Insert multiplication before opening parenthesis
+                self.input.append('*(')
+                return
+        elif operator == ')' and self.input.depth > 0:
+            # Closes a parenthesis that is open, e.g. a function's
+            self.input.append(')')
+            return
+
+        # A result still on the display becomes the first operand
+        self.input.append(operator)
+
+    def type_power(self):
+        if self.input.empty or self.input.last_char in '+-*/(':
+            raise ValueError("Missing base for power operation")
+        self.input.append('**')
+
+    def type_nth_root(self):
+        if self.input.empty:
+            # If empty, just insert the root function
+            self.input.append('**(1/')
+        else:
+            # If there's content, wrap it in parentheses and add root
+            self.input.reset(f"({self.input.text})**(1/")
+
+    def backspace(self):
+        self.input.pop()
+
+    def toggle_sign(self):
+        current = self.input.text
+        if current:
+            self.input.reset(current[1:] if current[0] == '-' else '-' + current)
+
+    # Results
+
+    def show_result(self, expression, value, text=None):
+        """Show a result and add it to history; text overrides how it is displayed"""
+        # Huge integers are shown in scientific notation; the exact value is
+        # kept for Ans, copying and the expanded view
+        result = Result(value)
+        self.input.reset(result.text if text is None else text, result=True)
+        self.history.append(HistoryEntry(expression, result))
+        self.result = result
+        return result
+
+    def recent_history(self):
+        """The history entries the history list shows, oldest first"""
+        return self.history[-HISTORY_SHOWN:]
+
+    def variables(self, expression):
+        """Values for the free names in expression: Ans, if it is used"""
+        if ANS not in expression or self.result is None:
+            return None
+        value = self.result.value
+        if self.digits is None and type(value) is Decimal:
+            value = float(value)
+        return {ANS: value}
+
+    # Memory
+
+    def memory_operation(self, operation, value=0):
+        """MC, MR, M+, M- or MS; value is the evaluated display, or the result it shows"""
+        if operation == 'MC':
+            self.memory = 0
+        elif operation == 'MR':
+            # Held like a result, so a shortened memory goes on as Ans with every digit
+            self.result = Result(self.memory)
+            self.input.reset(self.result.text, result=True)
+        elif operation == 'M+':
+            self.memory = _add(self.memory, value)
+        elif operation == 'M-':
+            self.memory = _add(self.memory, -value)
+        elif operation == 'MS':
+            self.memory = value
+
+    # Modes
+
+    def toggle_trig_mode(self):
+        self.trig_mode = "deg" if self.trig_mode == "rad" else "rad"
+
+    def set_digits(self, digits):
+        """Decimal mode to digits significant digits; 0 or None goes back to floats"""
+        self.digits = digits or None
+        if self.digits is not None:
+            self.exact = False
+
+    def toggle_exact(self):
+        """Switch exact fraction mode on or off; it replaces decimal mode"""
+        self.exact = not self.exact
+        if self.exact:
+            self.digits = None
+
+    def mode_text(self):
+        if self.exact:
+            return f"Mode: {self.trig_mode.upper()}, exact"
+        if self.digits is None:
+            return f"Mode: {self.trig_mode.upper()}"
+        return f"Mode: {self.trig_mode.upper()}, {self.digits} digits"
+
+
+def _add(a, b):
+    """a + b for values from any mode; a Decimal with a float or Fraction gives a Decimal"""
+    try:
+        return a + b
+    except TypeError:
+        return to_decimal(a) + to_decimal(b)
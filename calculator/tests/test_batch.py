@@ -0,0 +1,85 @@
+import io
+import json
+
+import pytest
+
+from batch import run_batch
+from calc import main
+from formatting import int_to_str
+
+
+@pytest.mark.parametrize('flush_every', [0, -1])
+def test_flush_every_must_be_positive(flush_every):
+    with pytest.raises(ValueError, match="at least 1"):
+        run_batch(['1+1'], io.StringIO(), flush_every=flush_every)
+
+
+@pytest.mark.parametrize('option', ['--flush-every', '--chunk-size'])
+def test_counts_must_be_positive_on_the_command_line(option, capsys):
+    with pytest.raises(SystemExit):
+        main(['--batch', option, '0'])
+    assert "must be at least 1" in capsys.readouterr().err
+
+
+LINES = ['1+1\n', '\n', 'sqrt(-1)\n', '2**200\n', '1/4\n', '2*(3+4\n']
+
+EXPECTED = {
+    'text': ("1+1 = 2\n"
+             "sqrt(-1) = Error: Evaluation error: math domain error\n"
+             f"2**200 = {2**200}\n"
+             "1/4 = 0.25\n"
+             "2*(3+4 = 14\n"),
+    'csv': ("line,expression,result,error\n"
+            "1,1+1,2,\n"
+            "3,sqrt(-1),,Evaluation error: math domain error\n"
+            f"4,2**200,{2**200},\n"
+            "5,1/4,0.25,\n"
+            "6,2*(3+4,14,\n"),
+    'jsonl': ('{"line": 1, "expression": "1+1", "result": 2}\n'
+              '{"line": 3, "expression": "sqrt(-1)", "error": "Evaluation error: math domain error"}\n'
+              f'{{"line": 4, "expression": "2**200", "result": {2**200}}}\n'
+              '{"line": 5, "expression": "1/4", "result": 0.25}\n'
+              '{"line": 6, "expression": "2*(3+4", "result": 14}\n'),
+}
+
+RUNS = {
+    'serial': {},
+    'chunked': {'workers': 2, 'chunk_size': 2},
+    'deadline': {'deadline': 30},
+}
+
+
+@pytest.mark.parametrize('run', RUNS)
+@pytest.mark.parametrize('fmt', EXPECTED)
+def test_formats(fmt, run):
+    out = io.StringIO()
+    assert run_batch(LINES, out, fmt, flush_every=2, **RUNS[run]) == (5, 1)
+    assert out.getvalue() == EXPECTED[fmt]
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError, match="Unknown format"):
+        run_batch(LINES, io.StringIO(), 'xml')
+
+
+def test_jsonl_writes_long_ints_and_fractions_as_strings():
+    out = io.StringIO()
+    run_batch(['2**20000', '1/3'], out, 'jsonl', exact=True)
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert records[0]['result'] == int_to_str(2**20000)
+    assert records[1]['result'] == '1/3'
+
+
+@pytest.mark.parametrize('run', RUNS)
+def test_modes(run):
+    out = io.StringIO()
+    run_batch(['1/3', '1/8'], out, digits=5, **RUNS[run])
+    assert out.getvalue() == "1/3 = 0.33333\n1/8 = 0.125\n"
+
+
+def test_deadline_stops_a_slow_expression():
+    out = io.StringIO()
+    assert run_batch(['factorial(200000) % 7', '1+2'], out, deadline=0.1) == (2, 1)
+    first, second = out.getvalue().splitlines()
+    assert first.startswith('factorial(200000) % 7 = Error:')
+    assert second == '1+2 = 3'
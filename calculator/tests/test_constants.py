@@ -0,0 +1,93 @@
+import decimal
+import math
+
+import pytest
+
+import constants
+
+DIGITS = 2000
+
+
+def _arctan_inverse(n, unity):
+    """arctan(1/n) * unity in integer arithmetic"""
+    term = total = unity // n
+    k = 1
+    while term:
+        term //= -n * n
+        k += 2
+        total += term // k
+    return total
+
+
+def _reference(name):
+    """The constant to DIGITS digits, computed independently of constants.py"""
+    places = DIGITS + 20
+    unity = 10 ** places
+    with decimal.localcontext() as context:
+        context.prec = places
+        if name == 'pi':  # Machin's formula
+            value = decimal.Decimal(4 * (4 * _arctan_inverse(5, unity) - _arctan_inverse(239, unity))) / unity
+        elif name == 'e':
+            value = decimal.Decimal(1).exp()
+        else:
+            value = decimal.Decimal(2 if name == 'ln2' else 10).ln()
+        context.prec = DIGITS
+        return +value
+
+
+@pytest.fixture(autouse=True)
+def cache(tmp_path, monkeypatch):
+    """Keep every test's cache in a fresh directory and empty memory"""
+    monkeypatch.setattr(constants, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(constants, '_fixed', {})
+    monkeypatch.setattr(constants, '_decimals', {})
+    return tmp_path
+
+
+@pytest.mark.parametrize('name', ['pi', 'e', 'ln2', 'ln10'])
+def test_constants_to_2000_digits(name):
+    value = getattr(constants, name)(DIGITS)
+    assert value == _reference(name)
+    assert len(value.as_tuple().digits) == DIGITS
+
+
+def test_fixed_point_matches_the_float_constants():
+    assert constants.fixed_point('pi', 15) == math.floor(math.pi * 10 ** 15)
+    assert constants.fixed_point('ln10', 15) // 10 == math.floor(math.log(10) * 10 ** 14)
+
+
+def test_constants_are_read_back_from_disk(cache, monkeypatch):
+    expected = constants.pi(500)
+    assert (cache / 'pi.bin').exists()
+
+    def fail(places):
+        raise AssertionError("recomputed a cached constant")
+    monkeypatch.setattr(constants, '_SERIES', {'pi': fail})
+    monkeypatch.setattr(constants, '_fixed', {})
+    monkeypatch.setattr(constants, '_decimals', {})
+    assert constants.pi(500) == expected
+    assert constants.pi(50) == decimal.Context(prec=50).create_decimal(_reference('pi'))
+
+
+def test_growing_a_constant_at_least_doubles_it(monkeypatch):
+    calls = []
+
+    def series(places):
+        calls.append(places)
+        return constants._e(places)
+    monkeypatch.setattr(constants, '_SERIES', {'e': series})
+    for digits in range(200, 300):
+        constants.e(digits)
+    assert len(calls) == 2
+    assert constants._fixed['e'][0] >= 2 * (200 + constants.GUARD_DIGITS)
+
+
+def test_unreadable_cache_is_recomputed(cache):
+    (cache / 'ln2.bin').write_bytes(b'\x01')
+    assert constants.ln2(100) == decimal.Context(prec=100).create_decimal(_reference('ln2'))
+
+
+def test_memory_only_cache(cache, monkeypatch):
+    monkeypatch.setattr(constants, 'CACHE_DIR', '')
+    assert constants.e(100) == decimal.Context(prec=100).create_decimal(_reference('e'))
+    assert not list(cache.iterdir())
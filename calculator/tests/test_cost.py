@@ -0,0 +1,27 @@
+import pytest
+
+from cost import BIG_INTEGER_PATH, FLOAT_PATH
+from engine import Engine
+from rational import RationalEngine
+
+
+@pytest.fixture
+def exact():
+    return RationalEngine(cache_size=0)
+
+
+def test_small_fractions_take_the_float_path(exact):
+    assert exact.estimate('1/3+1/6').path == FLOAT_PATH
+    assert exact.estimate('0.1+0.2').kind == 'fraction'
+
+
+def test_fraction_power_is_bounded(exact):
+    with pytest.raises(ValueError, match="Result too large"):
+        exact.estimate('(1/3)**100000000')
+    with pytest.raises(ValueError, match="Result too large"):
+        exact.estimate('2**(-100000000)')
+    assert exact.estimate('(1/3)**1000').path == BIG_INTEGER_PATH
+
+
+def test_float_engine_division_stays_float():
+    assert Engine(cache_size=0).estimate('(1/3)**100000000').path == FLOAT_PATH
@@ -0,0 +1,52 @@
+import math
+
+import pytest
+
+import engine
+from engine import Engine
+
+POINTS = [0.0, 1.0, -1.0, 1000.0]
+
+
+@pytest.fixture(params=['numpy', 'loop'])
+def array_mode(request, monkeypatch):
+    if request.param == 'loop':
+        monkeypatch.setattr(engine, '_numpy', None)
+    elif engine.load_numpy() is None:
+        pytest.skip("NumPy not installed")
+
+
+@pytest.mark.parametrize('expression', ['log10(x)', 'sqrt(x)', '1/x', 'exp(x)', 'x*2'])
+def test_array_paths_agree(array_mode, expression):
+    expected = []
+    for value in POINTS:
+        try:
+            expected.append(Engine().safe_eval(expression, variables={'x': value}))
+        except ValueError:
+            expected.append(math.nan)
+    result = list(Engine().evaluate_array(expression, POINTS))
+    assert result == pytest.approx(expected, nan_ok=True)
+
+
+@pytest.mark.parametrize('expression', ['factorial(x)', 'x**x', '2**x', '(-x)**0.5', 'x**x**x', 'x*3'])
+def test_array_loop_matches_numpy(expression, monkeypatch):
+    points = [0, 1, 3, 200, -1, 2.5]  # ints, as a caller may pass them
+    if engine.load_numpy() is None:
+        pytest.skip("NumPy not installed")
+    vectorised = Engine().evaluate_array(expression, points).tolist()
+    monkeypatch.setattr(engine, '_numpy', None)
+    loop = Engine().evaluate_array(expression, points)
+    assert all(type(value) is float for value in loop)
+    assert loop == pytest.approx(vectorised, nan_ok=True)
+
+
+def test_array_errors_are_value_errors(array_mode):
+    with pytest.raises(ValueError):
+        Engine().evaluate_array('factorial(x, x)', POINTS)
+
+
+def test_only_float_path_integers_are_folded():
+    engine = Engine()
+    assert engine._lookup('2**200', None, ())[2] == 2**200
+    assert engine._lookup('2**100000', None, ())[2] is None  # worked out when evaluated, not compiled
+    assert engine.evaluate('2**100000') == 2**100000
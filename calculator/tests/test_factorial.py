@@ -0,0 +1,49 @@
+import math
+
+import pytest
+
+from factorial import (SWING_THRESHOLD, TABLE_LIMIT, factorial, factorial_digits, factorial_text,
+                       scientific_factorial)
+
+
+@pytest.mark.parametrize('n', [0, 1, 5, TABLE_LIMIT, TABLE_LIMIT + 1, SWING_THRESHOLD - 1])
+def test_small_factorials(n):
+    assert factorial(n) == math.factorial(n)
+
+
+@pytest.mark.parametrize('n', [SWING_THRESHOLD, SWING_THRESHOLD + 1, 54321])
+def test_prime_swing(n):
+    assert factorial(n) == math.factorial(n)
+
+
+def test_negative():
+    with pytest.raises(ValueError, match="negative"):
+        factorial(-1)
+    with pytest.raises(ValueError, match="negative"):
+        factorial(-2.0)
+
+
+def test_non_integers_use_gamma():
+    assert factorial(2.5) == pytest.approx(math.gamma(3.5))
+    assert factorial(0.5) == pytest.approx(math.sqrt(math.pi) / 2)
+
+
+def test_factorial_digits():
+    assert [factorial_digits(n) for n in (0, 10, 25, 1000)] == [1, 7, 26, 2568]
+
+
+@pytest.mark.parametrize('x, text', [
+    (20, '2432902008176640000'),
+    (25, '15511210043330985984000000'),
+    (10**6, '8.26393e+5565708'),  # past EXACT_DIGITS: from log-gamma
+    (2.5, str(math.gamma(3.5))),
+])
+def test_factorial_text(x, text):
+    assert factorial_text(x) == text
+
+
+def test_scientific_factorial():
+    assert scientific_factorial(1000) == '4.02387260e+2567'  # fewer digits as the exponent grows
+    assert scientific_factorial(200.5).startswith('1.1174')  # gamma overflows a float here
+    with pytest.raises(ValueError, match="too large"):
+        scientific_factorial(10**13)
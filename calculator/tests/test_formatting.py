@@ -0,0 +1,65 @@
+import decimal
+import random
+import sys
+from fractions import Fraction
+
+import pytest
+
+from formatting import SHORT_DIGITS, count_digits, format_number, int_to_str, is_shortened, leading_digits, scientific
+
+NUMBERS = [0, 7, -12345, 2**8191, 2**8192, -(3**20000), 10**5000, 10**5000 - 1, 10**5000 + 1,
+           random.Random(1).getrandbits(40000)]
+
+
+@pytest.fixture(autouse=True)
+def unlimited_str():
+    # The reference str() refuses long ints from Python 3.11 on
+    if hasattr(sys, 'set_int_max_str_digits'):
+        limit = sys.get_int_max_str_digits()
+        sys.set_int_max_str_digits(0)
+        yield
+        sys.set_int_max_str_digits(limit)
+    else:
+        yield
+
+
+@pytest.mark.parametrize('n', NUMBERS, ids=range(len(NUMBERS)))
+def test_int_to_str(n):
+    assert int_to_str(n) == str(n)
+
+
+@pytest.mark.parametrize('n', NUMBERS, ids=range(len(NUMBERS)))
+def test_leading_digits(n):
+    text = str(abs(n))
+    for count in (1, 11, 30):
+        assert leading_digits(n, count) == (int(text[:count]), len(text))
+    assert count_digits(n) == len(text)
+
+
+@pytest.mark.parametrize('n, text', [
+    (2**100000, '9.990020930e+30102'),
+    (10**40, '1.000000000e+40'),
+    (99999999999 * 10**30, '1.000000000e+41'),  # rounds up into the next power of ten
+    (-(12345678915 * 10**30), '-1.234567892e+40'),
+    (0, '0'),
+], ids=['2**100000', '10**40', 'round up', 'negative', 'zero'])
+def test_scientific(n, text):
+    assert scientific(n) == text
+
+
+def test_format_number():
+    assert format_number(10**SHORT_DIGITS - 1) == '9' * SHORT_DIGITS
+    assert format_number(10**SHORT_DIGITS) == '1.000000000e+30'
+    assert format_number(10**SHORT_DIGITS, full=True) == '1' + '0' * SHORT_DIGITS
+    assert format_number(Fraction(1, 3)) == '1/3'
+    assert format_number(Fraction(1, 3**70)) == '3.994957557e-34'
+    assert format_number(decimal.Decimal('1.5')) == '1.5'
+    assert format_number(2.5) == '2.5'
+
+
+def test_is_shortened():
+    assert not is_shortened(10**SHORT_DIGITS - 1)
+    assert is_shortened(10**SHORT_DIGITS)
+    assert is_shortened(Fraction(1, 3**70))
+    assert is_shortened(decimal.Decimal('1.' + '1' * SHORT_DIGITS))
+    assert not is_shortened(2.5)
@@ -0,0 +1,46 @@
+import pytest
+
+from pool import EvaluationPool
+
+
+@pytest.fixture
+def pool():
+    with EvaluationPool(deadline=10) as pool:
+        yield pool
+
+
+def test_worker_job(pool):
+    # digits always go to a worker
+    assert str(pool.evaluate('1/8', digits=5)) == '0.125'
+
+
+def test_worker_died_while_idle(pool):
+    pool.evaluate('1', digits=5)  # the worker is up
+    worker = pool._workers[0]
+    worker.process.kill()
+    worker.process.join()
+    assert str(pool.submit('2+3', digits=5).result(timeout=30)) == '5'
+    assert pool._thread.is_alive()
+    assert str(pool.submit('2*3', digits=5).result(timeout=30)) == '6'
+
+
+def test_dispatcher_crash_fails_pending_futures(pool, monkeypatch):
+    def broken():
+        raise RuntimeError("boom")
+    monkeypatch.setattr(pool, '_dispatch', broken)
+    future = pool.submit('1+1', digits=5)
+    with pytest.raises(ValueError, match="Evaluation pool failed: boom"):
+        future.result(timeout=30)
+    with pytest.raises(RuntimeError):
+        pool.submit('1+1', digits=5)
+
+
+def test_cancel_running(pool):
+    pool.evaluate('1', digits=5)
+    future = pool.submit('tan(2)*sin(3)*cos(4)', digits=20000)
+    while not future.running():
+        pass
+    pool.cancel(future)
+    with pytest.raises(ValueError, match="cancelled"):
+        future.result(timeout=30)
+    assert str(pool.evaluate('1/4', digits=5)) == '0.25'
@@ -0,0 +1,65 @@
+import pytest
+
+from engine import Engine
+from precision import DecimalEngine
+from rational import RationalEngine
+
+
+@pytest.mark.parametrize('expression', [
+    '2**-1 % 5', '-8 % 5', '(-2)**3 % 5', '7**1000 % 1000', '-7.5 % 2', '10**40 % 7'
+])
+def test_modulo_agrees_across_modes(expression):
+    expected = Engine().evaluate(expression)
+    assert float(DecimalEngine(30).evaluate(expression)) == expected
+    assert float(RationalEngine().evaluate(expression)) == expected
+
+
+@pytest.mark.parametrize('expression', ['0**0', 'factorial(5)', 'factorial(3+2) % 7', '2**10', '2**-2'])
+def test_powers_and_factorials_agree_across_modes(expression):
+    expected = Engine().evaluate(expression)
+    assert float(DecimalEngine(30).evaluate(expression)) == expected
+    assert float(RationalEngine().evaluate(expression)) == expected
+
+
+def test_factorial_of_a_fraction_in_decimal_mode():
+    with pytest.raises(ValueError, match="whole numbers"):
+        DecimalEngine(30).evaluate('factorial(2.5)')
+
+
+def test_modulo_by_zero():
+    with pytest.raises(ValueError, match="division by zero"):
+        DecimalEngine(30).evaluate('5 % 0')
+
+
+@pytest.mark.parametrize('expression, expected', [
+    ('sin(180)', '0'), ('cos(-90)', '0'), ('sin(-450)', '-1'), ('tan(180)', '0'), ('sin(30)', '0.5')
+])
+def test_degrees_exact_at_multiples_of_90(expression, expected):
+    assert str(DecimalEngine(30).evaluate(expression, 'deg')) == expected
+
+
+def test_tan_of_90_degrees_is_undefined():
+    with pytest.raises(ValueError, match="undefined"):
+        DecimalEngine(30).evaluate('tan(90)', 'deg')
+
+
+def test_cost_check_rejects_huge_integers():
+    with pytest.raises(ValueError, match="Result too large"):
+        DecimalEngine(30).evaluate('9**9**9')
+
+
+@pytest.mark.parametrize('expression', ['log(0)', 'log10(0)', '0**-1'])
+def test_infinite_results_are_domain_errors(expression):
+    with pytest.raises(ValueError, match="math domain error"):
+        DecimalEngine(50).evaluate(expression)
+
+
+@pytest.mark.parametrize('expression', ['sin(1e70)', 'cos(1e70)'])
+def test_large_arguments(expression):
+    reference = DecimalEngine(100).evaluate(expression)
+    assert abs(DecimalEngine(50).evaluate(expression) - reference) < 1e-48
+
+
+def test_large_arguments_in_degrees():
+    engine = DecimalEngine(50)
+    assert engine.evaluate('sin(1e70)', 'deg') == engine.evaluate('sin(280)', 'deg')  # 10**70 % 360 == 280
@@ -0,0 +1,28 @@
+import time
+
+import pytest
+
+from preview import Previewer
+
+
+@pytest.fixture
+def previewer():
+    previewer = Previewer(deadline=10)
+    yield previewer
+    previewer.close()
+
+
+def test_preview(previewer):
+    assert previewer.submit('2*(3+4').result(timeout=30) == 14
+
+
+def test_newer_request_leaves_the_worker_running(previewer):
+    previewer.submit('1', digits=5).result(timeout=30)  # the worker is up
+    process = previewer._pool._workers[0].process
+    stale = previewer.submit('exp(2.5)', digits=5000)  # most of a second
+    while previewer._pool._workers[0].future is None:
+        time.sleep(0.01)
+    latest = previewer.submit('1/8', digits=5)
+    assert str(latest.result(timeout=30)) == '0.125'
+    assert stale.done()
+    assert previewer._pool._workers[0].process is process
@@ -0,0 +1,62 @@
+from decimal import Decimal
+from fractions import Fraction
+
+import pytest
+
+from rational import RationalEngine
+
+
+@pytest.mark.parametrize('expression, expected', [
+    ('1/3', Fraction(1, 3)),
+    ('1/3 + 1/6', Fraction(1, 2)),
+    ('1/3 * 3', 1),
+    ('6/3', 2),
+    ('0.1 + 0.2', Fraction(3, 10)),
+    ('2.5', Fraction(5, 2)),
+    ('(1/3) % (1/4)', Fraction(1, 12)),
+    ('10**40 / 10**39', 10),
+])
+def test_division_is_exact(expression, expected):
+    result = RationalEngine().evaluate(expression)
+    assert result == expected and type(result) is type(expected)
+
+
+def test_division_by_zero():
+    with pytest.raises(ValueError, match="division by zero"):
+        RationalEngine().evaluate('1/(3-3)')
+
+
+@pytest.mark.parametrize('expression, expected', [
+    ('2**-2', Fraction(1, 4)),
+    ('(2/3)**3', Fraction(8, 27)),
+    ('(2/3)**-2', Fraction(9, 4)),
+    ('4**(6/3)', 16),
+    ('(1/2)**(4-6)', 4),
+    ('3**70 / 3**69', 3),
+])
+def test_powers_with_a_whole_exponent_are_exact(expression, expected):
+    result = RationalEngine().evaluate(expression)
+    assert result == expected and type(result) is type(expected)
+
+
+def test_fractional_exponent_is_a_float():
+    assert RationalEngine().evaluate('4**(1/2)') == 2.0
+
+
+def test_zero_to_a_negative_power():
+    with pytest.raises(ValueError, match="negative power"):
+        RationalEngine().evaluate('0**(1-2)')
+
+
+def test_transcendental_functions_return_floats():
+    result = RationalEngine().evaluate('sqrt(2) + 1/3')
+    assert type(result) is float and result == pytest.approx(2 ** 0.5 + 1 / 3)
+
+
+def test_variables_from_decimal_mode_stay_exact():
+    assert RationalEngine().evaluate('x / 3', variables={'x': Decimal('0.3')}) == Fraction(1, 10)
+
+
+def test_cost_check_rejects_huge_fractions():
+    with pytest.raises(ValueError, match="Result too large"):
+        RationalEngine().evaluate('(1/3)**(10**9)')
@@ -0,0 +1,103 @@
+import asyncio
+import json
+
+import pytest
+
+from client import Client, load_test
+from server import EvaluationServer
+
+
+def serve(test, **options):
+    """Run test(port) against a server on a free port"""
+    async def main():
+        server = EvaluationServer(workers=1, deadline=10, **options)
+        listener = await server.start(port=0)
+        try:
+            async with listener:
+                return await test(listener.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+    return asyncio.run(main())
+
+
+async def raw_exchange(port, lines, count):
+    """Send raw request lines and return up to count responses, in the order they come"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    for line in lines:
+        writer.write(line + b'\n')
+        await writer.drain()
+    responses = []
+    for _ in range(count):
+        line = await asyncio.wait_for(reader.readline(), 30)
+        if not line:
+            break
+        responses.append(json.loads(line))
+    writer.close()
+    return responses
+
+
+def test_round_trip():
+    async def test(port):
+        client = await Client.connect(port=port)
+        try:
+            return (await client.evaluate('sin(30)', 'deg'), await client.evaluate('1/3', precision=3),
+                    await client.request('2**200'))
+        finally:
+            await client.close()
+    degrees, rounded, response = serve(test)
+    assert degrees == 0.5
+    assert rounded == 0.333
+    assert response == {'id': 3, 'result': 2**200}
+
+
+def test_pipelined_requests_keep_their_ids():
+    async def test(port):
+        client = await Client.connect(port=port)
+        try:
+            return await asyncio.gather(*(client.evaluate(f'{n}*2') for n in range(50)))
+        finally:
+            await client.close()
+    assert serve(test) == [n * 2 for n in range(50)]
+
+
+def test_evaluation_errors():
+    async def test(port):
+        client = await Client.connect(port=port)
+        try:
+            with pytest.raises(ValueError, match="division by zero"):
+                await client.evaluate('1/0')
+            with pytest.raises(ValueError, match="Result too large"):
+                await client.evaluate('9**9**9')
+            return await client.evaluate('1+1')  # the connection is still usable
+        finally:
+            await client.close()
+    assert serve(test) == 2
+
+
+@pytest.mark.parametrize('line, error', [
+    (b'not json', "Request is not valid JSON"),
+    (b'[1, 2]', "Request must be a JSON object"),
+    (b'{"id": 7}', "'expression' must be a string"),
+    (b'{"id": 7, "expression": "1", "mode": "grad"}', "'mode' must be 'rad' or 'deg'"),
+    (b'{"id": 7, "expression": "1", "precision": 99}', "'precision' must be an integer from 0 to 15"),
+])
+def test_bad_requests(line, error):
+    async def test(port):
+        return await raw_exchange(port, [line, b'', b'{"id": 8, "expression": "1+2"}'], 2)
+    # Responses may come back out of order; blank lines get none
+    failed, answered = sorted(serve(test), key=lambda response: 'result' in response)
+    assert failed == {'id': 7 if b'"id": 7' in line else None, 'error': error}
+    assert answered == {'id': 8, 'result': 3}
+
+
+def test_line_too_long_closes_the_connection():
+    async def test(port):
+        return await raw_exchange(port, [b'{"expression": "' + b'1+' * 200 + b'1"}', b'{"expression": "1"}'], 2)
+    assert serve(test, max_line=100) == [{'id': None, 'error': "Request line too long"}]
+
+
+def test_load_test():
+    async def test(port):
+        return await load_test(40, connections=2, pipeline=4, port=port)
+    latencies = serve(test)
+    assert len(latencies) == 40 and all(latency >= 0 for latency in latencies)
@@ -0,0 +1,102 @@
+import math
+
+import pytest
+
+from engine import Engine
+from input_state import CLOSE, DIGIT, ERROR_TEXT, NAME, OPERATOR, InputState
+from state import CalculatorState
+
+
+def type_keys(state, keys):
+    for key in keys:
+        if key.isdigit() or key == '.':
+            state.type_digit(key)
+        else:
+            state.type_operator(key)
+
+
+@pytest.mark.parametrize('text, depth, point, last', [
+    ('12.5', 0, True, DIGIT),
+    ('12.5+3', 0, False, DIGIT),
+    ('(1+', 1, False, OPERATOR),
+    ('(1+2)', 0, False, CLOSE),
+    ('math.pi', 0, True, NAME),
+    ('log10', 0, False, NAME),
+])
+def test_input_state_tracks_the_end(text, depth, point, last):
+    state = InputState(text)
+    assert (state.text, state.depth, state.point, state.last) == (text, depth, point, last)
+
+
+def test_backspace_restores_the_state_before():
+    state = InputState()
+    state.append('(1.5')
+    state.pop()
+    state.pop()
+    assert (state.text, state.depth, state.point, state.last) == ('(1', 1, False, DIGIT)
+    assert state.point_allowed()
+    for _ in range(3):
+        state.pop()  # one more than there is
+    assert state.empty and state.last is None
+
+
+def test_typing():
+    state = CalculatorState()
+    type_keys(state, '2(1.5.+3')
+    assert state.text == '2*(1.5+3'  # implicit multiplication, one point per number
+    type_keys(state, '))')
+    assert state.text == '2*(1.5+3))'
+
+
+def test_digit_after_result_starts_again():
+    state = CalculatorState()
+    state.show_result('1+2', 3)
+    type_keys(state, '+4')
+    assert state.text == '3+4'
+    state.show_result('3+4', 7)
+    type_keys(state, '5')
+    assert state.text == '5'
+
+
+def test_error_clears_on_the_next_key():
+    state = CalculatorState()
+    type_keys(state, '12')
+    state.set_error()
+    assert state.text == ERROR_TEXT and state.input.error
+    type_keys(state, '3')
+    assert state.text == '3' and not state.input.error
+
+
+@pytest.mark.parametrize('text, toggled', [('5', '-5'), ('-5', '5'), ('', '')])
+def test_toggle_sign(text, toggled):
+    state = CalculatorState()
+    state.set_text(text)
+    state.toggle_sign()
+    assert state.text == toggled
+
+
+def test_toggle_sign_of_a_shortened_result_uses_ans():
+    state = CalculatorState()
+    state.show_result('2**200', 2**200)
+    state.continue_from_result()
+    state.toggle_sign()
+    assert state.text == '-Ans'
+    assert state.variables(state.text) == {'Ans': 2**200}
+
+
+def test_log_of_a_shortened_result_uses_ans():
+    state = CalculatorState()
+    state.show_result('2**100000', 2**100000)
+    state.continue_from_result()  # as the log key does
+    value = Engine().evaluate(state.text, places=None, variables=state.variables(state.text))
+    assert math.log10(value) == pytest.approx(100000 * math.log10(2))
+
+
+def test_memory_recall_keeps_every_digit():
+    state = CalculatorState()
+    state.memory_operation('MS', 10**40 + 7)
+    state.memory_operation('MR')
+    state.continue_from_result()
+    type_keys(state, '-')
+    state.append('10**40')
+    assert Engine().evaluate(state.text, variables=state.variables(state.text)) == 7
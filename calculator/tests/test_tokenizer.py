@@ -0,0 +1,51 @@
+import pytest
+
+from tokenizer import FUNC, LPAREN, NAME, NUMBER, OPERATOR, RPAREN, to_source, tokenize
+
+
+def source(expression, close=True):
+    return to_source(tokenize(expression), close)
+
+
+def test_tokens():
+    assert tokenize('2×math.sin(π)^2') == [
+        (NUMBER, '2'), (OPERATOR, '*'), (FUNC, 'sin'), (LPAREN, '('), (NAME, 'pi'),
+        (RPAREN, ')'), (OPERATOR, '**'), (NUMBER, '2')
+    ]
+
+
+def test_unexpected_character():
+    with pytest.raises(ValueError, match="Unexpected character"):
+        tokenize('2 $ 3')
+
+
+@pytest.mark.parametrize('expression, expected', [
+    ('2(3)', '2*(3)'),
+    ('(1)(2)', '(1)*(2)'),
+    ('2sin(90)', '2*sin(90)'),
+    ('2π', '2*pi'),
+    ('2e', '2*e'),
+    ('pi(2)', 'pi*(2)'),  # a constant before '(' is multiplied, not called
+    ('2 3', '2 3'),  # numbers stay apart, so the parser rejects them
+    ('1.5e3+2', '1.5e3+2'),
+    ('()', '(0)'),
+])
+def test_implicit_multiplication(expression, expected):
+    assert source(expression) == expected
+
+
+@pytest.mark.parametrize('expression', ['1++2', '3*/4', '5-%2', '1)+(2'])
+def test_doubled_operators_and_unbalanced_parentheses(expression):
+    with pytest.raises(ValueError, match="Invalid expression format"):
+        source(expression)
+
+
+def test_power_may_be_followed_by_a_sign():
+    assert source('2**-1') == '2**-1'
+    assert source('2^-1') == '2**-1'
+
+
+def test_open_parentheses_are_closed():
+    assert source('sqrt(2*(3+4') == 'sqrt(2*(3+4))'
+    with pytest.raises(ValueError):
+        source('sqrt(2', close=False)
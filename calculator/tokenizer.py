@@ -0,0 +1,106 @@
+"""Single-pass tokenizer for calculator expressions.
+
+The display text is scanned once into a list of (kind, text) tokens. Operator
+aliases (× ÷ ^ π) and the math. prefix are normalised while scanning, and a
+second loop over the tokens validates them, inserts implicit multiplication
+and produces Python source, instead of rescanning the string several times.
+"""
+import re
+import string
+
+# Token kinds
+NUMBER = 'number'
+NAME = 'name'
+FUNC = 'func'
+OPERATOR = 'operator'
+LPAREN = 'lparen'
+RPAREN = 'rparen'
+COMMA = 'comma'
+
+# One alternative per token; \S catches operators, parentheses and stray characters
+_TOKEN_RE = re.compile(r'(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?|[A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*|\*\*|\S')
+
+# First character of a token -> token kind
+_KINDS = dict.fromkeys(string.digits + '.', NUMBER)
+_KINDS.update(dict.fromkeys(string.ascii_letters + '_π', NAME))
+_KINDS.update(dict.fromkeys('+-*/%^×÷−', OPERATOR))
+_KINDS.update({'(': LPAREN, ')': RPAREN, ',': COMMA})
+
+# Display spellings -> Python spellings
+OPERATOR_ALIASES = {'×': '*', '÷': '/', '^': '**', '−': '-'}
+NAME_ALIASES = {'π': 'pi'}
+
+# Names that are values rather than functions, even when followed by '('
+CONSTANTS = frozenset(['pi', 'e'])
+
+# Operators that may not follow one another (** is allowed before a sign)
+_SIMPLE_OPERATORS = frozenset('+-*/%')
+
+# Tokens that end an operand / tokens that start one
+_OPERAND_END = frozenset([NUMBER, NAME, RPAREN])
+_OPERAND_START = frozenset([NUMBER, NAME, FUNC, LPAREN])
+
+
+def tokenize(expr, constants=CONSTANTS):
+    """Split an expression into (kind, text) tokens in one scan"""
+    tokens = []
+    append = tokens.append
+    for text in _TOKEN_RE.findall(expr):
+        kind = _KINDS.get(text[0])
+        if kind is None:
+            raise ValueError(f"Unexpected character '{text}'")
+
+        if kind == OPERATOR:
+            text = OPERATOR_ALIASES.get(text, text)
+        elif kind == NAME:
+            text = NAME_ALIASES.get(text, text)
+            if text.startswith('math.'):
+                text = text[5:]
+        elif kind == LPAREN:
+            # A name directly before '(' is a function call
+            if tokens and tokens[-1][0] == NAME and tokens[-1][1] not in constants:
+                tokens[-1] = (FUNC, tokens[-1][1])
+        elif kind == RPAREN:
+            # Empty parentheses count as (0)
+            if tokens and tokens[-1][0] == LPAREN:
+                append((NUMBER, '0'))
+
+        append((kind, text))
+    return tokens
+
+
+def to_source(tokens, close=True):
+    """Validate tokens and join them into Python source in a single pass
+
+    Adds multiplication between adjacent operands, e.g. 2(3), 2sin(90),
+    (1)(2) and 2π, and appends missing closing parentheses when close is
+    true. Raises ValueError for unbalanced parentheses or doubled operators.
+    """
+    parts = []
+    append = parts.append
+    depth = 0
+    previous_kind = previous_text = None
+    for kind, text in tokens:
+        if kind == LPAREN:
+            depth += 1
+        elif kind == RPAREN:
+            depth -= 1
+            if depth < 0:
+                raise ValueError("Invalid expression format")
+        elif kind == OPERATOR:
+            if previous_kind == OPERATOR and previous_text in _SIMPLE_OPERATORS \
+                    and text in _SIMPLE_OPERATORS:
+                raise ValueError("Invalid expression format")
+
+        if previous_kind in _OPERAND_END and kind in _OPERAND_START:
+            # Keep separate numbers apart so "2 3" doesn't become "23"
+            append(' ' if previous_kind == kind == NUMBER else '*')
+
+        append(text)
+        previous_kind = kind
+        previous_text = text
+
+    if depth and not close:
+        raise ValueError("Invalid expression format")
+    append(')' * depth)
+    return ''.join(parts)